@@ -0,0 +1,70 @@
+"""
+Import-time / cold-start benchmark for the CLI entry points.
+
+Each target is imported in a fresh interpreter with `python -X importtime`
+and the cumulative import time of its top-level modules is compared with a
+budget. Exits non-zero when a target goes over budget.
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_PATH = Path(__file__).resolve().parents[1] / "src"
+
+# target name -> (modules imported by that command, budget in milliseconds)
+TARGETS = {
+    "cli": (["main"], 30),
+    "serve": (["main", "config.app"], 1500),
+    "seed": (["main", "db.engine", "seed"], 1500),
+}
+
+
+def import_time_ms(modules):
+    code = "; ".join(f"import {module}" for module in modules) or "pass"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=SRC_PATH,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_us = 0
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Only top-level entries, nested imports are already in their cumulative time
+        if name[1] != " ":
+            total_us += int(cumulative)
+    return total_us / 1000
+
+
+def cold_start_ms(modules):
+    # Subtract the interpreter's own startup imports (encodings, site, ...)
+    return import_time_ms(modules) - import_time_ms([])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every budget")
+    args = parser.parse_args()
+
+    failed = False
+    for target, (modules, budget) in TARGETS.items():
+        samples = [cold_start_ms(modules) for _ in range(args.runs)]
+        median = statistics.median(samples)
+        limit = budget * args.scale
+        status = "ok" if median <= limit else "OVER BUDGET"
+        failed = failed or median > limit
+        print(f"{target:<6} median {median:8.1f} ms  budget {limit:8.1f} ms  {status}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
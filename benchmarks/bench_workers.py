@@ -0,0 +1,106 @@
+"""
+Throughput scaling of `python main.py serve` with the number of workers.
+
+For each worker count a server is started on a free port, a fixed number of
+client processes hammer one path over keep-alive connections, and requests
+per second are reported. The server is stopped with SIGTERM (graceful drain).
+
+    python benchmarks/bench_workers.py --workers 1 2 4 --path /health
+"""
+import argparse
+import http.client
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+SRC_PATH = Path(__file__).resolve().parents[1] / "src"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/health")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not become ready")
+
+
+def client(port: int, path: str, requests: int) -> int:
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    ok = 0
+    for _ in range(requests):
+        connection.request("GET", path)
+        response = connection.getresponse()
+        response.read()
+        ok += response.status == 200
+    return ok
+
+
+def run(workers: int, path: str, clients: int, requests: int) -> float:
+    port = free_port()
+    env = {
+        **os.environ,
+        "WORKERS": str(workers),
+        "APP_PORT": str(port),
+        "APP_HOST": "127.0.0.1",
+        "DEBUG": "false",
+        "LOG_LEVEL": "WARNING",
+        # Keep the rate limiter out of the measurement
+        "LIMIT": str(10**9),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "main.py", "serve"],
+        cwd=SRC_PATH,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_ready(port)
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=clients) as pool:
+            ok = sum(pool.map(client, [port] * clients, [path] * clients, [requests] * clients))
+        elapsed = time.perf_counter() - started
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+    if ok != clients * requests:
+        print(f"  warning: {clients * requests - ok} non-200 responses")
+    return clients * requests / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=500, help="Per client")
+    args = parser.parse_args()
+
+    baseline = None
+    for workers in args.workers:
+        throughput = run(workers, args.path, args.clients, args.requests)
+        baseline = baseline or throughput
+        print(
+            f"workers={workers:<3} {throughput:10.1f} req/s  "
+            f"x{throughput / baseline:.2f} vs {args.workers[0]} worker(s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ from logging.config import fileConfig
 from sqlalchemy import engine_from_config, pool
 
 from alembic import context
-from db.engine import get_engine
+from db.engine import create_maintenance_engine
 from models import Base
 
 # this is the Alembic Config object, which provides
@@ -64,7 +64,8 @@ def run_migrations_online() -> None:
     #     poolclass=pool.NullPool,
     # )
 
-    connectable = get_engine()
+    # Not get_engine(): its statement timeout would cancel long DDL
+    connectable = create_maintenance_engine()
 
     with connectable.connect() as connection:
         context.configure(
@@ -0,0 +1,109 @@
+"""Partition users by org_id
+
+Revision ID: 566eb88d917b
+Revises: b0842e2eb4a1
+Create Date: 2026-10-19 14:03:27.551902
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '566eb88d917b'
+down_revision: Union[str, Sequence[str], None] = 'b0842e2eb4a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS = 16
+SEARCH_COLUMNS = ("first_name", "last_name", "email")
+COLUMNS = (
+    "id, first_name, last_name, email, phone_number, position, department, "
+    "location, status, org_id"
+)
+
+
+def user_columns() -> list:
+    return [
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('users_id_seq')"), nullable=False),
+        sa.Column('first_name', sa.String(length=100), nullable=False),
+        sa.Column('last_name', sa.String(length=100), nullable=False),
+        sa.Column('email', sa.String(length=150), nullable=False),
+        sa.Column('phone_number', sa.String(length=20), nullable=True),
+        sa.Column('position', sa.String(length=100), nullable=True),
+        sa.Column('department', sa.String(length=100), nullable=True),
+        sa.Column('location', sa.String(length=100), nullable=True),
+        sa.Column('status', postgresql.ENUM(name='statusenum', create_type=False), nullable=False),
+        sa.Column('org_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['org_id'], ['organizations.id'], name='users_org_id_fkey'),
+    ]
+
+
+def swap_users_table(new_table: str) -> None:
+    # Block writes until the migration commits so none land after the copy;
+    # reads keep working until DROP TABLE takes its exclusive lock.
+    op.execute("LOCK TABLE users IN SHARE ROW EXCLUSIVE MODE")
+    op.execute(f"INSERT INTO {new_table} ({COLUMNS}) SELECT {COLUMNS} FROM users")
+    # Keep the id sequence alive while the old table is dropped
+    op.execute("ALTER SEQUENCE users_id_seq OWNED BY NONE")
+    op.drop_table('users')
+    op.rename_table(new_table, 'users')
+    for suffix in ("pkey", "email_key", "phone_number_key"):
+        op.execute(
+            f"ALTER TABLE users RENAME CONSTRAINT {new_table}_{suffix} TO users_{suffix}"
+        )
+    op.execute("ALTER SEQUENCE users_id_seq OWNED BY users.id")
+    op.create_index('ix_users_org_id_id', 'users', ['org_id', 'id'], unique=False)
+    for column in SEARCH_COLUMNS:
+        op.create_index(
+            f"ix_users_{column}_trgm",
+            "users",
+            [column],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_ops={column: "gin_trgm_ops"},
+        )
+    op.execute("ANALYZE users")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        op.create_index('ix_users_org_id_id', 'users', ['org_id', 'id'], unique=False)
+        return
+
+    # Unique constraints on a partitioned table must include the partition key,
+    # so email and phone_number become unique per organization.
+    op.create_table('users_partitioned',
+    *user_columns(),
+    sa.PrimaryKeyConstraint('id', 'org_id', name='users_partitioned_pkey'),
+    sa.UniqueConstraint('email', 'org_id', name='users_partitioned_email_key'),
+    sa.UniqueConstraint('phone_number', 'org_id', name='users_partitioned_phone_number_key'),
+    postgresql_partition_by='HASH (org_id)'
+    )
+    for remainder in range(PARTITIONS):
+        op.execute(
+            f"CREATE TABLE users_p{remainder} PARTITION OF users_partitioned "
+            f"FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})"
+        )
+    swap_users_table('users_partitioned')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        op.drop_index('ix_users_org_id_id', table_name='users')
+        return
+
+    # Fails if the same email or phone number now exists in two organizations
+    op.create_table('users_unpartitioned',
+    *user_columns(),
+    sa.PrimaryKeyConstraint('id', name='users_unpartitioned_pkey'),
+    sa.UniqueConstraint('email', name='users_unpartitioned_email_key'),
+    sa.UniqueConstraint('phone_number', name='users_unpartitioned_phone_number_key')
+    )
+    swap_users_table('users_unpartitioned')
+    op.drop_index('ix_users_org_id_id', table_name='users')
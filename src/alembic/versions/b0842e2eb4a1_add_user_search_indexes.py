@@ -0,0 +1,45 @@
+"""Add user search indexes
+
+Revision ID: b0842e2eb4a1
+Revises: 4fccb6662799
+Create Date: 2026-10-19 09:12:41.208317
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'b0842e2eb4a1'
+down_revision: Union[str, Sequence[str], None] = '4fccb6662799'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_COLUMNS = ("first_name", "last_name", "email")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Trigram GIN indexes serve ILIKE '%q%' lookups; other backends scan.
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for column in SEARCH_COLUMNS:
+        op.create_index(
+            f"ix_users_{column}_trgm",
+            "users",
+            [column],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_ops={column: "gin_trgm_ops"},
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for column in SEARCH_COLUMNS:
+        op.drop_index(f"ix_users_{column}_trgm", table_name="users")
@@ -0,0 +1,51 @@
+"""Add users updated_at
+
+Revision ID: f34da5f59eeb
+Revises: 566eb88d917b
+Create Date: 2026-10-19 16:41:05.382174
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'f34da5f59eeb'
+down_revision: Union[str, Sequence[str], None] = '566eb88d917b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False))
+    op.create_index('ix_users_updated_at_id', 'users', ['updated_at', 'id'], unique=False)
+
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    # Keep updated_at current for writes that bypass the ORM (bulk SQL, psql)
+    op.execute(
+        """
+        CREATE FUNCTION set_updated_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at = now();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER users_set_updated_at BEFORE UPDATE ON users "
+        "FOR EACH ROW EXECUTE FUNCTION set_updated_at()"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP TRIGGER users_set_updated_at ON users")
+        op.execute("DROP FUNCTION set_updated_at()")
+    op.drop_index('ix_users_updated_at_id', table_name='users')
+    op.drop_column('users', 'updated_at')
@@ -1,24 +1,67 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy import Engine, select
 from sqlalchemy.orm import Session
 
-from db.engine import get_engine
+from db.engine import get_engine, get_read_engine
 from models import Organization, User
-from schemas.users import FilterParam
-from services import user_services
+from schemas.users import ChangesParam, FilterParam
+from services import user_ingest_services, user_services
+from services.coalescing import CoalescedCallTimeout
+from services.ingest import IngestFormatError
 
 router = APIRouter()
 
+INGEST_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
 
+
+# Plain `def` endpoints run in the threadpool, so concurrent identical
+# requests can overlap and be coalesced by the service layer.
 @router.get("/users", tags=["users"])
-async def get_users(
-    query_params: Annotated[FilterParam, Query()], engine: Engine = Depends(get_engine)
+def get_users(
+    query_params: Annotated[FilterParam, Query()], engine: Engine = Depends(get_read_engine)
 ):
-    return user_services.get_user_list(query_params, engine)
+    try:
+        return user_services.get_user_list(query_params, engine)
+    except CoalescedCallTimeout as exc:
+        raise HTTPException(status_code=504, detail=str(exc))
 
 
 @router.get("/users/filters", tags=["users"])
-async def get_filter_values(engine: Engine = Depends(get_engine)):
-    return user_services.get_filter_values(engine=engine)
+def get_filter_values(engine: Engine = Depends(get_read_engine)):
+    try:
+        return user_services.get_filter_values(engine=engine)
+    except CoalescedCallTimeout as exc:
+        raise HTTPException(status_code=504, detail=str(exc))
+
+
+# Reads the primary: a lagging replica could let the watermark skip rows.
+@router.get("/users/changes", tags=["users"])
+def get_user_changes(
+    query_params: Annotated[ChangesParam, Query()], engine: Engine = Depends(get_engine)
+):
+    try:
+        return user_services.get_user_changes(query_params, engine)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@router.post("/users/bulk", tags=["users"])
+async def bulk_ingest_users(request: Request, engine: Engine = Depends(get_engine)):
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    fmt = INGEST_CONTENT_TYPES.get(content_type)
+    if fmt is None:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Content-Type must be one of {', '.join(INGEST_CONTENT_TYPES)}",
+        )
+    try:
+        return await user_ingest_services.ingest_stream(request.stream(), fmt, engine)
+    except IngestFormatError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
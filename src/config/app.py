@@ -1,16 +1,56 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import OperationalError
 
 from api.routers import router
+from db.engine import get_engine
+from db.replicas import get_replica_router
+from middleware.admission import AdmissionControlMiddleware, Bulkhead
 from middleware.rate_limiter import (SlidingWindowRateLimiter,
                                      SlidingWindowRateLimitMiddleware,
-                                     default_key_func)
+                                     default_cost_func, default_key_func)
+from services import user_services
 
 from .settings import get_settings
 
-settings = get_settings()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pools are created once the server starts, not when modules are imported
+    if get_engine not in app.dependency_overrides:
+        get_engine()
+    if get_replica_router not in app.dependency_overrides:
+        get_replica_router().start()
+    yield
+    if get_engine.cache_info().currsize:
+        get_engine().dispose()
+    if get_replica_router.cache_info().currsize:
+        get_replica_router().stop()
+        for replica in get_replica_router().replicas:
+            replica.engine.dispose()
 
 
 def register_middlewares(app: FastAPI) -> None:
+    settings = get_settings()
+    app.state.bulkheads = {
+        "api": Bulkhead(
+            max_concurrent=settings.admission_api_concurrency,
+            max_queue=settings.admission_api_queue,
+            queue_timeout=settings.admission_queue_timeout,
+            statement_timeout_ms=settings.admission_api_statement_timeout_ms,
+        ),
+        "export": Bulkhead(
+            max_concurrent=settings.admission_export_concurrency,
+            max_queue=settings.admission_export_queue,
+            queue_timeout=settings.admission_queue_timeout,
+            statement_timeout_ms=settings.admission_export_statement_timeout_ms,
+        ),
+    }
+    app.add_middleware(AdmissionControlMiddleware, bulkheads=app.state.bulkheads)
+
+    # Added last so it runs first: over-limit clients never take a bulkhead slot
     limiter = SlidingWindowRateLimiter(
         limit=settings.limit, window_seconds=settings.window_time
     )
@@ -20,21 +60,51 @@ def register_middlewares(app: FastAPI) -> None:
         key_func=default_key_func,
         limit=limiter.limit,
         window_seconds=limiter.window,
+        cost_func=default_cost_func,
     )
 
 
+def register_exception_handlers(app: FastAPI) -> None:
+    @app.exception_handler(OperationalError)
+    async def statement_timeout_handler(request: Request, exc: OperationalError):
+        # 57014 = query_canceled, raised when statement_timeout fires
+        if getattr(exc.orig, "pgcode", None) != "57014":
+            raise exc
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Query exceeded its statement timeout"},
+            headers={"Retry-After": "1"},
+        )
+
+
 def register_router(app: FastAPI) -> None:
     app.include_router(router)
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title=settings.app_name, debug=settings.debug)
+    settings = get_settings()
+    app = FastAPI(title=settings.app_name, debug=settings.debug, lifespan=lifespan)
 
     @app.get("/health", tags=["Health"])
     async def health_check():
         return {"status": "ok"}
 
+    @app.get("/health/replicas", tags=["Health"])
+    async def replica_health():
+        return get_replica_router().metrics()
+
+    @app.get("/health/coalescing", tags=["Health"])
+    async def coalescing_metrics():
+        return user_services.coalescer.metrics()
+
+    @app.get("/health/admission", tags=["Health"])
+    async def admission_metrics():
+        return {
+            name: bulkhead.metrics() for name, bulkhead in app.state.bulkheads.items()
+        }
+
     register_middlewares(app)
+    register_exception_handlers(app)
     register_router(app)
 
     return app
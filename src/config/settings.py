@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import List, Optional
 
 from fastapi import FastAPI
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -10,15 +11,53 @@ class Settings(BaseSettings):
     app_port: int = 8000
     debug: bool = False
     log_level: str = "INFO"
+    # Production serve mode: worker processes, recycle after N requests (0 = never)
+    workers: int = 1
+    max_requests: int = 0
+    # Random extra requests per worker (default 10%) so workers do not recycle together
+    max_requests_jitter: Optional[int] = None
+    graceful_timeout: int = 30
     limit: int = 10
     window_time: int = 10
+    # Concurrency bulkheads per route class ("api", "export") and query timeouts
+    admission_queue_timeout: float = 5.0
+    admission_api_concurrency: int = 32
+    admission_api_queue: int = 64
+    admission_api_statement_timeout_ms: int = 5000
+    admission_export_concurrency: int = 4
+    admission_export_queue: int = 8
+    admission_export_statement_timeout_ms: int = 120000
     db_host: str = "localhost"
     db_user: str = "root"
     db_password: str = "123"
     db_name: str = "user_management"
     db_port: int = 5432
+    # Default for every Postgres connection, 0 disables
+    db_statement_timeout_ms: int = 0
+    # JSON list of SQLAlchemy URLs, e.g. '["postgresql+psycopg2://u:p@replica1/db"]'
+    db_replica_urls: List[str] = []
+    db_replica_strategy: str = "round_robin"
+    db_replica_max_lag: float = 5.0
+    db_replica_health_interval: float = 10.0
+    # Seconds to connect to a replica, also the lag probe's query timeout
+    db_replica_connect_timeout: int = 2
+    snapshot_enabled: bool = False
+    snapshot_memory_budget_mb: int = 256
+    snapshot_refresh_interval: float = 5.0
+    coalescing_timeout: float = 30.0
+    # Seconds filter values are cached; bounds staleness across workers
+    filter_cache_ttl: float = 60.0
+    # Upper bound on a write transaction; newer rows are held back from /users/changes
+    changes_settle_seconds: float = 60.0
+    ingest_chunk_size: int = 5000
+    ingest_queue_size: int = 64
     model_config = SettingsConfigDict(env_file=".env")
 
+    @property
+    def db_pool_size(self) -> int:
+        # Every request the bulkheads admit may hold a connection at the same time
+        return self.admission_api_concurrency + self.admission_export_concurrency
+
 
 @lru_cache
 def get_settings() -> Settings:
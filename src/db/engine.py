@@ -1,19 +1,57 @@
+import os
+from functools import lru_cache
 from urllib.parse import quote
 
+from fastapi import Depends
 from sqlalchemy import URL, Engine, create_engine
+from sqlalchemy.pool import NullPool
 
 from config.settings import get_settings
 
-settings = get_settings()
+from .replicas import ReplicaRouter, get_replica_router
+from .timeouts import create_timed_engine
 
-url_object = URL.create(
-    "postgresql+psycopg2",
-    username=settings.db_user,
-    password=quote(settings.db_password),
-    host=settings.db_host,
-    database=settings.db_name,
-)
 
+def get_url() -> URL:
+    settings = get_settings()
+    return URL.create(
+        "postgresql+psycopg2",
+        username=settings.db_user,
+        password=quote(settings.db_password),
+        host=settings.db_host,
+        port=settings.db_port,
+        database=settings.db_name,
+    )
 
+
+@lru_cache
 def get_engine() -> Engine:
-    return create_engine(url=url_object)
+    # One engine (and connection pool) per process, created on first use
+    return create_timed_engine(get_url())
+
+
+def create_maintenance_engine() -> Engine:
+    # For migrations, seeding and file ingest: no statement timeout, no pool
+    return create_engine(get_url(), poolclass=NullPool)
+
+
+def dispose_after_fork() -> None:
+    # A forked worker must open its own connections, never reuse the parent's
+    if get_engine.cache_info().currsize:
+        get_engine().dispose(close=False)
+    if get_replica_router.cache_info().currsize:
+        for replica in get_replica_router().replicas:
+            replica.engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=dispose_after_fork)
+
+
+def get_read_engine(
+    engine: Engine = Depends(get_engine),
+    router: ReplicaRouter = Depends(get_replica_router),
+) -> Engine:
+    # Read-only paths go to a healthy replica, or stay on the primary
+    if not router.replicas:
+        return engine
+    return router.get_engine(primary=engine)
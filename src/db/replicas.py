@@ -0,0 +1,179 @@
+import itertools
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional
+
+from sqlalchemy import Engine, text
+from sqlalchemy.engine import make_url
+
+from common.logger import logger
+from config.settings import get_settings
+
+from .timeouts import create_timed_engine
+
+# Seconds the replica is behind the primary; 0 when fully replayed.
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+    "END"
+)
+
+
+@dataclass
+class ReplicaState:
+    engine: Engine
+    healthy: bool = True
+    lag_seconds: float = 0.0
+    selected: int = 0
+    last_error: Optional[str] = None
+
+
+class ReplicaRouter:
+    """
+    Routes read-only work across replica engines:
+      - `strategy`: "round_robin" or "least_connections" (fewest checked-out connections)
+      - `max_lag_seconds`: replicas further behind the primary are skipped
+      - `health_check_interval`: seconds between health/lag probes
+      - `probe_timeout`: seconds a lag query may run on Postgres
+    Probes run in a background thread once `start()` is called; `get_engine`
+    only reads their last result, so a hanging replica never stalls requests.
+    When no replica is usable the caller's primary engine is returned instead.
+    """
+
+    STRATEGIES = ("round_robin", "least_connections")
+
+    def __init__(
+        self,
+        replicas: List[Engine],
+        strategy: str = "round_robin",
+        max_lag_seconds: float = 5.0,
+        health_check_interval: float = 10.0,
+        probe_timeout: float = 2.0,
+    ):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(
+                f"Unknown routing strategy {strategy!r}, accepted are {','.join(self.STRATEGIES)}"
+            )
+        self.replicas = [ReplicaState(engine=engine) for engine in replicas]
+        self.strategy = strategy
+        self.max_lag = float(max_lag_seconds)
+        self.interval = float(health_check_interval)
+        self.probe_timeout = float(probe_timeout)
+        self.primary_fallbacks = 0
+        self._cycle = itertools.cycle(range(len(self.replicas)))
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _measure_lag(self, engine: Engine) -> float:
+        with engine.connect() as connection:
+            if engine.dialect.name != "postgresql":
+                connection.execute(text("SELECT 1"))
+                return 0.0
+            connection = connection.execution_options(
+                statement_timeout_ms=int(self.probe_timeout * 1000)
+            )
+            return float(connection.execute(POSTGRES_LAG_QUERY).scalar() or 0)
+
+    def check_health(self) -> None:
+        for state in self.replicas:
+            # Probe without the lock: get_engine keeps using the previous result
+            try:
+                lag_seconds, error = self._measure_lag(state.engine), None
+            except Exception as exc:
+                lag_seconds, error = state.lag_seconds, str(exc)
+                logger.warning("Replica %s failed health check: %s", state.engine.url, exc)
+            with self._lock:
+                state.lag_seconds = lag_seconds
+                state.healthy = error is None and lag_seconds <= self.max_lag
+                state.last_error = error
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check_health()
+
+    def start(self) -> None:
+        """Probes every replica once, then keeps probing in a daemon thread."""
+        if not self.replicas or self._thread is not None:
+            return
+        self.check_health()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="replica-health", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _checked_out(self, state: ReplicaState) -> int:
+        checkedout = getattr(state.engine.pool, "checkedout", None)
+        return checkedout() if checkedout else 0
+
+    def get_engine(self, primary: Engine) -> Engine:
+        with self._lock:
+            healthy = [state for state in self.replicas if state.healthy]
+            if not healthy:
+                self.primary_fallbacks += 1
+                return primary
+
+            if self.strategy == "least_connections":
+                chosen = min(healthy, key=self._checked_out)
+            else:
+                chosen = None
+                while chosen is None:
+                    candidate = self.replicas[next(self._cycle)]
+                    if candidate.healthy:
+                        chosen = candidate
+            chosen.selected += 1
+            return chosen.engine
+
+    def metrics(self) -> dict:
+        replicas = []
+        for state in self.replicas:
+            pool = state.engine.pool
+            replicas.append(
+                {
+                    "url": state.engine.url.render_as_string(hide_password=True),
+                    "healthy": state.healthy,
+                    "lag_seconds": state.lag_seconds,
+                    "selected": state.selected,
+                    "last_error": state.last_error,
+                    "pool": {
+                        "status": pool.status(),
+                        "checked_out": self._checked_out(state),
+                    },
+                }
+            )
+        return {
+            "strategy": self.strategy,
+            "primary_fallbacks": self.primary_fallbacks,
+            "replicas": replicas,
+        }
+
+
+def create_replica_engine(url: str, connect_timeout: int) -> Engine:
+    kwargs = {}
+    if make_url(url).get_backend_name() == "postgresql":
+        # Bound probes and checkouts against an unreachable host
+        kwargs["connect_args"] = {"connect_timeout": connect_timeout}
+    return create_timed_engine(url, pool_pre_ping=True, **kwargs)
+
+
+@lru_cache
+def get_replica_router() -> ReplicaRouter:
+    settings = get_settings()
+    return ReplicaRouter(
+        replicas=[
+            create_replica_engine(url, settings.db_replica_connect_timeout)
+            for url in settings.db_replica_urls
+        ],
+        strategy=settings.db_replica_strategy,
+        max_lag_seconds=settings.db_replica_max_lag,
+        health_check_interval=settings.db_replica_health_interval,
+        probe_timeout=settings.db_replica_connect_timeout,
+    )
@@ -0,0 +1,58 @@
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.engine import make_url
+
+from config.settings import get_settings
+
+# Connections beyond the bulkheads' capacity, e.g. for replica health probes
+POOL_HEADROOM = 2
+
+# Per-request statement timeout (ms), set by the admission middleware
+statement_timeout_ms: ContextVar[Optional[int]] = ContextVar(
+    "statement_timeout_ms", default=None
+)
+
+
+def apply_statement_timeout(conn, cursor, statement, parameters, context, executemany):
+    """
+    before_cursor_execute hook: applies the request's statement timeout with
+    SET LOCAL, once per transaction. An explicit
+    `execution_options(statement_timeout_ms=...)` takes precedence.
+    """
+    timeout = statement_timeout_ms.get()
+    if context is not None:
+        timeout = context.execution_options.get("statement_timeout_ms", timeout)
+    if not timeout or conn.info.get("statement_timeout_ms") == int(timeout):
+        return
+    cursor.execute(f"SET LOCAL statement_timeout = {int(timeout)}")
+    conn.info["statement_timeout_ms"] = int(timeout)
+
+
+def reset_statement_timeout(conn) -> None:
+    # SET LOCAL ends with the transaction
+    conn.info.pop("statement_timeout_ms", None)
+
+
+def create_timed_engine(url, **kwargs) -> Engine:
+    """
+    create_engine() for Postgres with DB_STATEMENT_TIMEOUT_MS as the session
+    default and per-request overrides. Other backends have no statement timeout.
+    The pool holds a connection for every request the bulkheads admit, so an
+    admitted request never waits on pool_timeout.
+    """
+    if make_url(url).get_backend_name() != "postgresql":
+        return create_engine(url, **kwargs)
+    settings = get_settings()
+    kwargs.setdefault("pool_size", settings.db_pool_size)
+    kwargs.setdefault("max_overflow", POOL_HEADROOM)
+    if settings.db_statement_timeout_ms:
+        kwargs.setdefault("connect_args", {})["options"] = (
+            f"-c statement_timeout={settings.db_statement_timeout_ms}"
+        )
+    engine = create_engine(url, **kwargs)
+    event.listen(engine, "before_cursor_execute", apply_statement_timeout)
+    event.listen(engine, "commit", reset_statement_timeout)
+    event.listen(engine, "rollback", reset_statement_timeout)
+    return engine
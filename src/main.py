@@ -1,29 +1,88 @@
+import argparse
 import sys
+from pathlib import Path
 
-import uvicorn
+# Keep module-level imports to the stdlib: each command imports only what it needs.
+BASE_DIR = Path(__file__).resolve().parent
 
-from config.app import app
-from config.settings import get_settings
-from db.engine import get_engine
-from seed import seed
 
-accepted_command = ["seed"]
+def serve(args: argparse.Namespace) -> None:
+    import uvicorn
 
-def parse_command(*args, **kwargs):
-    if len(args) <= 1:
-        return False
-    else:
-        command = args[1]
-        if command not in accepted_command:
-            raise Exception(
-                f"Command does not exists, accepted command are {','.join(accepted_command)}"
-            )
-        else:
-            seed(engine=get_engine())
-        return True
+    from config.settings import get_settings
 
-if __name__ == "__main__":
     settings = get_settings()
-    flag = parse_command(*sys.argv)
-    if not flag:
-        uvicorn.run("main:app", host=settings.app_host, port=settings.app_port, reload=settings.debug)
+    workers = args.workers or settings.workers
+    jitter = settings.max_requests_jitter
+    if jitter is None:
+        jitter = settings.max_requests // 10
+    # Each worker imports the app itself, so engines and pools are per process.
+    # SIGTERM stops accepting connections and drains in-flight requests.
+    uvicorn.run(
+        "config.app:app",
+        host=settings.app_host,
+        port=args.port or settings.app_port,
+        reload=settings.debug and workers == 1,
+        workers=workers,
+        limit_max_requests=settings.max_requests or None,
+        limit_max_requests_jitter=jitter,
+        timeout_graceful_shutdown=settings.graceful_timeout,
+    )
+
+
+def seed(args: argparse.Namespace) -> None:
+    from db.engine import create_maintenance_engine
+    from seed import seed as seed_data
+
+    seed_data(engine=create_maintenance_engine())
+
+
+def ingest(args: argparse.Namespace) -> None:
+    import json
+
+    from db.engine import create_maintenance_engine
+    from services import user_ingest_services
+
+    fmt = args.format or ("csv" if args.path.suffix == ".csv" else "ndjson")
+    with args.path.open(newline="", encoding="utf-8") as lines:
+        report = user_ingest_services.ingest(lines, fmt, create_maintenance_engine())
+    print(json.dumps(report, indent=2))
+
+
+def migrate(args: argparse.Namespace) -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    command.upgrade(Config(str(BASE_DIR / "alembic.ini")), args.revision)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="main.py")
+    subparsers = parser.add_subparsers(dest="command")
+
+    serve_parser = subparsers.add_parser("serve", help="Run the API server (default)")
+    serve_parser.add_argument("--workers", type=int, help="Overrides WORKERS")
+    serve_parser.add_argument("--port", type=int, help="Overrides APP_PORT")
+    serve_parser.set_defaults(handler=serve)
+    subparsers.add_parser("seed", help="Insert sample organizations and users").set_defaults(
+        handler=seed
+    )
+    ingest_parser = subparsers.add_parser("ingest", help="Bulk upsert users from a file")
+    ingest_parser.add_argument("path", type=Path, help="CSV or NDJSON file")
+    ingest_parser.add_argument("--format", choices=["csv", "ndjson"])
+    ingest_parser.set_defaults(handler=ingest)
+    migrate_parser = subparsers.add_parser("migrate", help="Apply Alembic migrations")
+    migrate_parser.add_argument("revision", nargs="?", default="head")
+    migrate_parser.set_defaults(handler=migrate)
+
+    parser.set_defaults(handler=serve, workers=None, port=None)
+    return parser
+
+
+def main(argv=None) -> None:
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1 +1,2 @@
+from .admission import AdmissionControlMiddleware
 from .rate_limiter import SlidingWindowRateLimitMiddleware
@@ -0,0 +1,108 @@
+import asyncio
+from typing import Callable, Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from db.timeouts import statement_timeout_ms
+
+
+class Bulkhead:
+    """
+    Concurrency limit for one class of routes:
+      - `max_concurrent`: requests allowed to run at once
+      - `max_queue`: requests allowed to wait for a slot; beyond that they are shed
+      - `queue_timeout`: seconds a queued request waits before being shed
+      - `statement_timeout_ms`: per-query database timeout for this class (0 = engine default)
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queue: int,
+        queue_timeout: float = 5.0,
+        statement_timeout_ms: int = 0,
+    ):
+        self.max_concurrent = int(max_concurrent)
+        self.max_queue = int(max_queue)
+        self.queue_timeout = float(queue_timeout)
+        self.statement_timeout_ms = int(statement_timeout_ms)
+        self.active = 0
+        self.waiting = 0
+        self.shed = 0
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+    async def acquire(self) -> bool:
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.shed += 1
+            return False
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.shed += 1
+            return False
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+    def metrics(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "shed": self.shed,
+        }
+
+
+def default_route_class(request: Request) -> Optional[str]:
+    """
+    "export" for bulk reads/writes, "api" for other API routes.
+    Health checks are not classified, so they never queue behind heavy work.
+    """
+    path = request.url.path
+    if not path.startswith("/api/"):
+        return None
+    if path.endswith("/users/changes") or path.endswith("/users/bulk"):
+        return "export"
+    return "api"
+
+
+class AdmissionControlMiddleware(BaseHTTPMiddleware):
+    def __init__(
+        self,
+        app: FastAPI,
+        bulkheads: Dict[str, Bulkhead],
+        classify: Callable[[Request], Optional[str]] = default_route_class,
+    ):
+        super().__init__(app)
+        self.bulkheads = bulkheads
+        self.classify = classify
+
+    async def dispatch(self, request: Request, call_next):
+        route_class = self.classify(request)
+        bulkhead = self.bulkheads.get(route_class)
+        if bulkhead is None:
+            return await call_next(request)
+
+        if not await bulkhead.acquire():
+            # Shed fast instead of letting the queue (and latency) grow
+            return JSONResponse(
+                status_code=503,
+                content={"detail": "Service Unavailable", "route_class": route_class},
+                headers={"Retry-After": "1"},
+            )
+
+        token = statement_timeout_ms.set(bulkhead.statement_timeout_ms or None)
+        try:
+            return await call_next(request)
+        finally:
+            statement_timeout_ms.reset(token)
+            bulkhead.release()
@@ -1,4 +1,5 @@
 import asyncio
+import math
 import time
 from collections import deque
 from typing import Callable, Deque, Dict, Tuple
@@ -7,36 +8,49 @@ from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 
+# Cost units: one per request, or per this many rows scanned / bytes uploaded
+ROWS_PER_COST_UNIT = 500
+BYTES_PER_COST_UNIT = 1024 * 1024
+# Streamed (chunked) uploads have no Content-Length: charge them as a 10 MB upload
+STREAMED_UPLOAD_COST = 10
+
 
 class SlidingWindowRateLimiter:
     """
     In-memory sliding window limiter:
-      - `limit`: max requests allowed within `window_seconds`
+      - `limit`: max cost units allowed within `window_seconds`
       - `window_seconds`: rolling window size in seconds
     Internals:
-      - For each key, we store a deque of request timestamps (monotonic seconds).
-      - Old timestamps are evicted on each check.
+      - For each key, we store a deque of (timestamp, cost) entries (monotonic seconds)
+        and the running cost total of the window.
+      - Old entries are evicted on each check.
+    A plain request costs 1 unit, so `limit` is then a request count.
     """
 
     def __init__(self, limit: int, window_seconds: float):
         self.limit = int(limit)
         self.window = float(window_seconds)
-        self._buckets: Dict[str, Deque[float]] = {}
+        self._buckets: Dict[str, Deque[Tuple[float, int]]] = {}
+        self._used: Dict[str, int] = {}
         self._lock = asyncio.Lock()
         self._last_sweep = time.monotonic()
 
     def _now(self) -> float:
         return time.monotonic()
 
-    def _evict_older_than(self, dq: Deque[float], cutoff: float) -> None:
-        while dq and dq[0] <= cutoff:
-            dq.popleft()
+    def _evict_older_than(self, key: str, cutoff: float) -> None:
+        dq = self._buckets[key]
+        while dq and dq[0][0] <= cutoff:
+            _, cost = dq.popleft()
+            self._used[key] -= cost
 
-    async def allow(self, key: str) -> Tuple[bool, int, float]:
+    async def allow(self, key: str, cost: int = 1) -> Tuple[bool, int, float]:
         """
         Returns (allowed, remaining, retry_after_seconds).
         retry_after_seconds = 0 when allowed.
+        A cost above `limit` is charged as `limit` (it needs the whole window).
         """
+        cost = min(max(1, int(cost)), self.limit)
         now = self._now()
         cutoff = now - self.window
 
@@ -44,20 +58,26 @@ class SlidingWindowRateLimiter:
             dq = self._buckets.get(key)
             if dq is None:
                 dq = self._buckets[key] = deque()
+                self._used[key] = 0
 
             # Evict old entries
-            self._evict_older_than(dq, cutoff)
+            self._evict_older_than(key, cutoff)
 
-            if len(dq) < self.limit:
-                dq.append(now)
-                remaining = self.limit - len(dq)
+            if self._used[key] + cost <= self.limit:
+                dq.append((now, cost))
+                self._used[key] += cost
+                remaining = self.limit - self._used[key]
                 self._maybe_sweep(now)
                 return True, remaining, 0.0
 
-            # Not allowed: compute when the oldest request will fall out of the window
-            oldest = dq[0]
-            retry_after = (oldest + self.window) - now
-            remaining = 0
+            # Not allowed: compute when enough cost will fall out of the window
+            to_free = self._used[key] + cost - self.limit
+            for timestamp, entry_cost in dq:
+                to_free -= entry_cost
+                if to_free <= 0:
+                    break
+            retry_after = (timestamp + self.window) - now
+            remaining = self.limit - self._used[key]
             self._maybe_sweep(now)
             return False, remaining, max(0.0, retry_after)
 
@@ -69,11 +89,12 @@ class SlidingWindowRateLimiter:
         cutoff = now - self.window
         to_delete = []
         for key, dq in self._buckets.items():
-            self._evict_older_than(dq, cutoff)
+            self._evict_older_than(key, cutoff)
             if not dq:
                 to_delete.append(key)
         for key in to_delete:
             self._buckets.pop(key, None)
+            self._used.pop(key, None)
 
 
 def default_key_func(request: Request) -> str:
@@ -89,6 +110,35 @@ def default_key_func(request: Request) -> str:
     return f"{client_ip}:{request.url.path}"
 
 
+def default_cost_func(request: Request) -> int:
+    """
+    Weights requests by the work they cause:
+      - listings and exports cost one unit per ROWS_PER_COST_UNIT rows read
+        (offset + limit, since skipped rows are still scanned)
+      - bulk uploads cost one unit per BYTES_PER_COST_UNIT of body, or
+        STREAMED_UPLOAD_COST when the body is streamed without a length
+      - everything else (health checks, filters) costs 1
+    """
+    params = request.query_params
+    path = request.url.path
+    if path.endswith("/users/bulk"):
+        length = request.headers.get("content-length")
+        if not length or not length.isdigit():
+            return STREAMED_UPLOAD_COST
+        return max(1, math.ceil(int(length) / BYTES_PER_COST_UNIT))
+    if path.endswith("/users") or path.endswith("/users/changes"):
+        try:
+            offset = int(params.get("offset", 0))
+            limit = int(params.get("limit", 1000 if path.endswith("/changes") else 100))
+        except ValueError:
+            # Let request validation report the bad parameter
+            return 1
+        # A multi-organization listing reads a page per organization
+        orgs = max(1, len(params.getlist("org_id")))
+        return max(1, math.ceil(orgs * (offset + limit) / ROWS_PER_COST_UNIT))
+    return 1
+
+
 class SlidingWindowRateLimitMiddleware(BaseHTTPMiddleware):
     def __init__(
         self,
@@ -97,16 +147,19 @@ class SlidingWindowRateLimitMiddleware(BaseHTTPMiddleware):
         key_func: Callable[[Request], str] = default_key_func,
         limit: int = 100,
         window_seconds: float = 60.0,
+        cost_func: Callable[[Request], int] = lambda request: 1,
     ):
         super().__init__(app)
         self.limiter = limiter
         self.key_func = key_func
         self.limit = limit
         self.window = window_seconds
+        self.cost_func = cost_func
 
     async def dispatch(self, request: Request, call_next):
         key = self.key_func(request)
-        allowed, remaining, retry_after = await self.limiter.allow(key)
+        cost = self.cost_func(request)
+        allowed, remaining, retry_after = await self.limiter.allow(key, cost)
 
         # RFC-compliant Retry-After and informative X-RateLimit-* headers
         headers = {
@@ -114,6 +167,7 @@ class SlidingWindowRateLimitMiddleware(BaseHTTPMiddleware):
             "X-RateLimit-Remaining": str(max(0, remaining)),
             # Seconds until the window fully resets for this key
             "X-RateLimit-Reset": str(int(retry_after)),
+            "X-RateLimit-Cost": str(cost),
         }
 
         if not allowed:
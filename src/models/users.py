@@ -1,6 +1,9 @@
 import enum
+from datetime import datetime
 
-from sqlalchemy import Enum, ForeignKey, Integer, String
+from sqlalchemy import (DateTime, Enum, ForeignKey, Index, Integer, String,
+                        UniqueConstraint, func)
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -12,14 +15,48 @@ class StatusEnum(enum.Enum):
     NOT_STARTED = "NOT_STARTED"
 
 
+def trigram_index(column: str) -> Index:
+    # pg_trgm GIN index backing substring search; skipped on other backends
+    return Index(
+        f"ix_users_{column}_trgm",
+        column,
+        postgresql_using="gin",
+        postgresql_ops={column: "gin_trgm_ops"},
+    ).ddl_if(dialect="postgresql")
+
+
+# SQLite's CURRENT_TIMESTAMP has no fractional seconds; store and bind the same
+# format so watermark comparisons on updated_at stay exact.
+UpdatedAt = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite",
+)
+
+
 class User(Base):
+    # On Postgres the table is hash-partitioned on org_id (see the
+    # partition_users_by_org_id migration), so uniqueness is per organization
+    # and every listing should filter on org_id to prune partitions. The
+    # migration's primary key is (id, org_id); the model keeps `id` alone since
+    # ids still come from one sequence and the ORM identifies rows by id.
     __tablename__ = "users"
+    __table_args__ = (
+        UniqueConstraint("email", "org_id", name="users_email_key"),
+        UniqueConstraint("phone_number", "org_id", name="users_phone_number_key"),
+        Index("ix_users_org_id_id", "org_id", "id"),
+        Index("ix_users_updated_at_id", "updated_at", "id"),
+        trigram_index("first_name"),
+        trigram_index("last_name"),
+        trigram_index("email"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     first_name: Mapped[str] = mapped_column(String(100), nullable=False)
     last_name: Mapped[str] = mapped_column(String(100), nullable=False)
-    email: Mapped[str] = mapped_column(String(150), unique=True, nullable=False)
-    phone_number: Mapped[str] = mapped_column(String(20), unique=True, nullable=True)
+    email: Mapped[str] = mapped_column(String(150), nullable=False)
+    phone_number: Mapped[str] = mapped_column(String(20), nullable=True)
     position: Mapped[str] = mapped_column(String(100), nullable=True)
     department: Mapped[str] = mapped_column(String(100), nullable=True)
     location: Mapped[str] = mapped_column(String(100), nullable=True)
@@ -27,4 +64,11 @@ class User(Base):
         Enum(StatusEnum), nullable=False, default=StatusEnum.ACTIVE
     )
     org_id: Mapped[int] = mapped_column(ForeignKey("organizations.id"))
+    # Set on insert and every update (a trigger also covers raw SQL on Postgres)
+    updated_at: Mapped[datetime] = mapped_column(
+        UpdatedAt,
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
     organization: Mapped["Organization"] = relationship(back_populates="users")
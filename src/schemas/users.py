@@ -15,4 +15,26 @@ class FilterParam(BaseModel):
     location: Optional[str] = ""
     department: Optional[str] = ""
     position: Optional[str] = ""
+    # Substring search over first_name, last_name and email
+    q: Optional[str] = Field("", max_length=100)
+    # One or more organizations; several ids return per-organization pages
+    org_id: List[int] = []
+
+
+class ChangesParam(BaseModel):
+    limit: int = Field(1000, gt=0, le=10000)
+    # Watermark returned by the previous call; omit to start from the beginning
+    since: Optional[str] = None
     org_id: Optional[int] = None
+
+
+class UserIngest(BaseModel):
+    first_name: str = Field(min_length=1, max_length=100)
+    last_name: str = Field(min_length=1, max_length=100)
+    email: str = Field(min_length=3, max_length=150, pattern=r"^[^@\s]+@[^@\s]+$")
+    phone_number: Optional[str] = Field(None, max_length=20)
+    position: Optional[str] = Field(None, max_length=100)
+    department: Optional[str] = Field(None, max_length=100)
+    location: Optional[str] = Field(None, max_length=100)
+    status: StatusEnum = StatusEnum.ACTIVE
+    org_id: int
@@ -1 +1,2 @@
+from .ingest import user_ingest_services
 from .users import user_services
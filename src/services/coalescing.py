@@ -0,0 +1,68 @@
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class CoalescedCallTimeout(TimeoutError):
+    pass
+
+
+@dataclass
+class _Call:
+    event: threading.Event = field(default_factory=threading.Event)
+    result: Any = None
+    error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls:
+      - The first caller for a key (the leader) runs the function.
+      - Callers arriving while it runs wait for, and share, its result or error.
+      - Waiters give up after `timeout` seconds with CoalescedCallTimeout.
+    Nothing is cached: once the leader finishes the next call runs again.
+    """
+
+    def __init__(self, timeout: float = 30.0):
+        self.timeout = float(timeout)
+        self.executions = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as exc:
+                call.error = exc
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.event.set()
+        elif not call.event.wait(self.timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise CoalescedCallTimeout(f"Timed out after {self.timeout}s waiting for {key!r}")
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def metrics(self) -> dict:
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "timeouts": self.timeouts,
+            "in_flight": len(self._calls),
+        }
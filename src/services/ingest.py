@@ -0,0 +1,254 @@
+import asyncio
+import codecs
+import csv
+import io
+import json
+from itertools import islice
+from typing import AsyncIterator, Callable, Iterable, Iterator, Optional, Set
+
+import anyio
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import Engine, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+
+from config.settings import get_settings
+from models import Organization, User
+from schemas.users import UserIngest
+
+from .users import user_services
+
+INGEST_COLUMNS = tuple(UserIngest.model_fields)
+CONFLICT_COLUMNS = ("email", "org_id")
+UPDATE_COLUMNS = tuple(name for name in INGEST_COLUMNS if name not in CONFLICT_COLUMNS)
+
+STAGING_TABLE = """
+CREATE TEMP TABLE IF NOT EXISTS users_staging (
+    first_name VARCHAR(100),
+    last_name VARCHAR(100),
+    email VARCHAR(150),
+    phone_number VARCHAR(20),
+    position VARCHAR(100),
+    department VARCHAR(100),
+    location VARCHAR(100),
+    status statusenum,
+    org_id INTEGER
+) ON COMMIT DELETE ROWS
+"""
+
+
+class IngestFormatError(ValueError):
+    pass
+
+
+class UserIngestService:
+    """
+    Streams CSV or NDJSON user records into the users table:
+      - records are validated and upserted on (email, org_id) in chunks of `chunk_size`
+      - on Postgres/psycopg2 each chunk is COPY'd into a temp staging table and
+        merged with INSERT ... ON CONFLICT; other backends use a batched upsert
+      - at most `queue_size` batches of lines are buffered, so a slow database
+        stops the request body from being read (backpressure)
+    Errors are reported per chunk; a failing chunk does not stop the ingest.
+    """
+
+    FORMATS = ("csv", "ndjson")
+
+    def __init__(
+        self,
+        chunk_size: int = 5000,
+        queue_size: int = 64,
+        on_change: Optional[Callable[[Set[int]], None]] = None,
+    ):
+        self.chunk_size = int(chunk_size)
+        self.queue_size = int(queue_size)
+        # Called with the touched org ids so dependent caches can be dropped
+        self.on_change = on_change
+
+    def records(self, lines: Iterable[str], fmt: str) -> Iterator[tuple]:
+        """Yields (line number, record dict or parse error message)."""
+        if fmt == "csv":
+            reader = csv.DictReader(lines)
+            for record in reader:
+                yield reader.line_num, {
+                    key: (value if value != "" else None)
+                    for key, value in record.items()
+                    if key
+                }
+            return
+
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line)
+            except ValueError as exc:
+                yield number, f"Invalid JSON: {exc}"
+
+    def validate(self, chunk: list, engine: Engine) -> tuple:
+        rows, errors = {}, []
+        for number, record in chunk:
+            if isinstance(record, str):
+                errors.append({"line": number, "error": record})
+                continue
+            try:
+                user = UserIngest.model_validate(record)
+            except ValidationError as exc:
+                message = "; ".join(
+                    f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                    for error in exc.errors()
+                )
+                errors.append({"line": number, "error": message})
+                continue
+            # ON CONFLICT cannot touch the same row twice in one statement: last wins
+            rows[(user.email, user.org_id)] = (number, user)
+
+        org_ids = {user.org_id for _, user in rows.values()}
+        with engine.connect() as connection:
+            statement = select(Organization.id).where(Organization.id.in_(org_ids))
+            known = set(connection.execute(statement).scalars())
+        valid = []
+        for number, user in rows.values():
+            if user.org_id in known:
+                valid.append(user)
+            else:
+                errors.append(
+                    {
+                        "line": number,
+                        "error": f"org_id: organization {user.org_id} not found",
+                    }
+                )
+        return valid, errors
+
+    def upsert(self, users: list, engine: Engine) -> None:
+        with engine.begin() as connection:
+            if engine.dialect.name == "postgresql" and engine.dialect.driver == "psycopg2":
+                self.copy_upsert(connection, users)
+                return
+
+            dialect_insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+            if engine.dialect.name not in dialect_insert:
+                raise NotImplementedError(
+                    f"Bulk upsert is not supported on {engine.dialect.name}"
+                )
+            statement = dialect_insert[engine.dialect.name](User)
+            statement = statement.on_conflict_do_update(
+                index_elements=list(CONFLICT_COLUMNS),
+                set_={
+                    **{name: statement.excluded[name] for name in UPDATE_COLUMNS},
+                    "updated_at": func.now(),
+                },
+            )
+            connection.execute(statement, [user.model_dump() for user in users])
+
+    def copy_upsert(self, connection, users: list) -> None:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for user in users:
+            row = user.model_dump()
+            row["status"] = user.status.value
+            writer.writerow(
+                ["" if row[name] is None else row[name] for name in INGEST_COLUMNS]
+            )
+        buffer.seek(0)
+
+        columns = ", ".join(INGEST_COLUMNS)
+        connection.exec_driver_sql(STAGING_TABLE)
+        with connection.connection.dbapi_connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY users_staging ({columns}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        updates = ", ".join(f"{name} = EXCLUDED.{name}" for name in UPDATE_COLUMNS)
+        connection.exec_driver_sql(
+            f"INSERT INTO users ({columns}) SELECT {columns} FROM users_staging "
+            f"ON CONFLICT ({', '.join(CONFLICT_COLUMNS)}) DO UPDATE SET {updates}"
+        )
+
+    def ingest(self, lines: Iterable[str], fmt: str, engine: Engine) -> dict:
+        if fmt not in self.FORMATS:
+            raise IngestFormatError(
+                f"Unsupported format {fmt!r}, accepted are {','.join(self.FORMATS)}"
+            )
+        report = {"received": 0, "upserted": 0, "failed": 0, "chunks": []}
+        touched: Set[int] = set()
+        records = self.records(lines, fmt)
+        while chunk := list(islice(records, self.chunk_size)):
+            errors = []
+            try:
+                users, errors = self.validate(chunk, engine)
+                # Superseded duplicates count as upserted: their last version was written
+                upserted = len(chunk) - len(errors)
+                if users:
+                    self.upsert(users, engine)
+                    touched.update(user.org_id for user in users)
+            except SQLAlchemyError as exc:
+                upserted = 0
+                reason = getattr(exc, "orig", None) or exc
+                errors.append({"line": None, "error": f"Chunk failed: {reason}"})
+            report["chunks"].append(
+                {
+                    "chunk": len(report["chunks"]) + 1,
+                    "received": len(chunk),
+                    "upserted": upserted,
+                    "errors": errors,
+                }
+            )
+            report["received"] += len(chunk)
+            report["upserted"] += upserted
+            report["failed"] += len(chunk) - upserted
+
+        if touched and self.on_change:
+            self.on_change(touched)
+        return report
+
+    async def ingest_stream(
+        self, body: AsyncIterator[bytes], fmt: str, engine: Engine
+    ) -> dict:
+        """
+        Feeds a streamed request body to `ingest` running in a worker thread
+        through a bounded stream of decoded lines.
+        """
+        send, receive = anyio.create_memory_object_stream(self.queue_size)
+
+        def consume() -> dict:
+            try:
+                return self.ingest(self._drain(receive), fmt, engine)
+            finally:
+                # Wakes up the reader below if the worker stops early
+                receive.close()
+
+        worker = asyncio.ensure_future(run_in_threadpool(consume))
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        pending = ""
+        try:
+            async with send:
+                async for data in body:
+                    pending += decoder.decode(data)
+                    *lines, pending = pending.split("\n")
+                    if lines:
+                        # Waits for room instead of reading more of the body
+                        await send.send([line + "\n" for line in lines])
+                pending += decoder.decode(b"", final=True)
+                if pending:
+                    await send.send([pending])
+        except anyio.BrokenResourceError:
+            # The worker stopped reading; its report or error is returned below
+            pass
+        return await worker
+
+    def _drain(self, receive) -> Iterator[str]:
+        while True:
+            try:
+                lines = anyio.from_thread.run(receive.receive)
+            except anyio.EndOfStream:
+                return
+            yield from lines
+
+settings = get_settings()
+
+user_ingest_services = UserIngestService(
+    chunk_size=settings.ingest_chunk_size,
+    queue_size=settings.ingest_queue_size,
+    on_change=user_services.invalidate,
+)
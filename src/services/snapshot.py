@@ -0,0 +1,321 @@
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import Engine, func, or_, select
+from sqlalchemy.orm import Session
+
+from models import Organization, User
+from models.users import StatusEnum
+from schemas.users import FilterParam
+
+# Low-cardinality columns stored as dictionary codes and filtered with bitmasks
+ENCODED_COLUMNS = ("status", "location", "department", "position")
+PLAIN_COLUMNS = tuple(
+    column.name for column in User.__table__.columns if column.name not in ENCODED_COLUMNS
+)
+# Rows per bitmask block when paging; whole blocks are skipped by popcount
+PAGE_BLOCK_BYTES = 64
+
+
+def field_list_for(org_config: Optional[dict]) -> List[str]:
+    if org_config:
+        return [key for key, value in org_config.items() if value is True]
+    return [column.name for column in User.__table__.columns]
+
+
+class OrgSnapshot:
+    """
+    Column-oriented, in-memory copy of one organization's users.
+    Row `i` of every column belongs to the same user (ordered by id).
+    Filters are answered with int bitmasks: bit `i` is set when row `i` matches.
+    Every column is kept, `field_list` only controls what `page` returns.
+    """
+
+    def __init__(self, org_id: int, field_list: List[str]):
+        self.org_id = org_id
+        self.field_list = field_list
+        # Held while rows are applied and while a page is read
+        self.lock = threading.RLock()
+        self.count = 0
+        self.max_id = 0
+        self.max_updated_at = None
+        self.nbytes = 0
+        self.checked_at = 0.0
+        # Database clock when rows were last read
+        self.synced_at = None
+        self.values: Dict[str, list] = {name: [] for name in PLAIN_COLUMNS}
+        self.codes: Dict[str, array] = {name: array("I") for name in ENCODED_COLUMNS}
+        self.dictionaries: Dict[str, list] = {name: [] for name in ENCODED_COLUMNS}
+        self.lookup: Dict[str, dict] = {name: {} for name in ENCODED_COLUMNS}
+        self.positions: Dict[int, int] = {}
+        self._masks: Dict[tuple, int] = {}
+
+    def encode(self, name: str, value) -> int:
+        code = self.lookup[name].get(value)
+        if code is None:
+            code = self.lookup[name][value] = len(self.dictionaries[name])
+            self.dictionaries[name].append(value)
+            self.nbytes += sys.getsizeof(value)
+        return code
+
+    def upsert(self, rows) -> None:
+        with self.lock:
+            self._upsert(rows)
+
+    def _upsert(self, rows) -> None:
+        # New ids are appended, known ids are overwritten in place
+        for row in rows:
+            position = self.positions.get(row["id"])
+            if position is None:
+                self.positions[row["id"]] = self.count
+                for name in PLAIN_COLUMNS:
+                    self.values[name].append(row[name])
+                    self.nbytes += sys.getsizeof(row[name]) + 8
+                for name in ENCODED_COLUMNS:
+                    self.codes[name].append(self.encode(name, row[name]))
+                    self.nbytes += self.codes[name].itemsize
+                self.count += 1
+            else:
+                for name in PLAIN_COLUMNS:
+                    self.values[name][position] = row[name]
+                for name in ENCODED_COLUMNS:
+                    self.codes[name][position] = self.encode(name, row[name])
+            self.max_id = max(self.max_id, row["id"])
+            if self.max_updated_at is None or row["updated_at"] > self.max_updated_at:
+                self.max_updated_at = row["updated_at"]
+        # Masks are sized to the row count and may be stale, rebuild them lazily
+        self._masks.clear()
+
+    def mask_for(self, column: str, value) -> int:
+        code = self.lookup[column].get(value)
+        if code is None:
+            return 0
+        key = (column, code)
+        if key not in self._masks:
+            bits = bytearray((self.count + 7) // 8)
+            for i, row_code in enumerate(self.codes[column]):
+                if row_code == code:
+                    bits[i >> 3] |= 1 << (i & 7)
+            self._masks[key] = int.from_bytes(bits, "little")
+        return self._masks[key]
+
+    def filter(self, query_params: FilterParam) -> int:
+        mask = (1 << self.count) - 1
+        for column in ("location", "department", "position"):
+            value = getattr(query_params, column)
+            if value:
+                mask &= self.mask_for(column, value)
+        if query_params.status:
+            status_mask = 0
+            for status in query_params.status:
+                status_mask |= self.mask_for("status", StatusEnum(status))
+            mask &= status_mask
+        return mask
+
+    def value(self, name: str, row: int):
+        if name in self.codes:
+            return self.dictionaries[name][self.codes[name][row]]
+        return self.values[name][row]
+
+    def page(self, mask: int, offset: int, limit: int) -> List[dict]:
+        # Walk the mask block by block so big-int operations stay block sized
+        bits = mask.to_bytes((self.count + 7) // 8, "little")
+        data = []
+        for start in range(0, len(bits), PAGE_BLOCK_BYTES):
+            block = int.from_bytes(bits[start : start + PAGE_BLOCK_BYTES], "little")
+            matches = block.bit_count()
+            if matches <= offset:
+                offset -= matches
+                continue
+            while block and len(data) < limit:
+                lowest = block & -block
+                block ^= lowest
+                if offset:
+                    offset -= 1
+                    continue
+                row = start * 8 + lowest.bit_length() - 1
+                data.append({name: self.value(name, row) for name in self.field_list})
+            if len(data) == limit:
+                break
+        return data
+
+    def query(self, query_params: FilterParam) -> tuple:
+        """Returns (matching row count, requested page)."""
+        with self.lock:
+            mask = self.filter(query_params)
+            return mask.bit_count(), self.page(
+                mask, query_params.offset, query_params.limit
+            )
+
+
+class SnapshotStore:
+    """
+    Read-through cache of OrgSnapshot objects:
+      - `memory_budget_bytes`: least recently used organizations are evicted above it
+      - `refresh_interval`: seconds between data version checks for a snapshot
+      - `settle_seconds`: longest expected write transaction (see the changes feed)
+    The data version is (row count, max id, max updated_at). Inserted and
+    updated rows are applied incrementally; deletions reload the organization.
+    updated_at is a transaction's start time, so a write committing late can
+    carry one older than the snapshot's max without changing the version:
+    rows are re-read until the last read is `settle_seconds` past that max.
+    The organization's org_config is re-read with every version check.
+    Database reads happen outside the store lock, one loader per organization.
+    """
+
+    def __init__(
+        self,
+        memory_budget_bytes: int,
+        refresh_interval: float = 5.0,
+        settle_seconds: float = 60.0,
+    ):
+        self.budget = int(memory_budget_bytes)
+        self.interval = float(refresh_interval)
+        self.settle = timedelta(seconds=settle_seconds)
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self._snapshots: "OrderedDict[int, OrgSnapshot]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._org_locks: Dict[int, threading.Lock] = {}
+        # Bumped by invalidate so loads that started before it are not stored
+        self._generation = 0
+
+    def _now(self) -> float:
+        return time.monotonic()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(snapshot.nbytes for snapshot in self._snapshots.values())
+
+    def _version(self, session: Session, org_id: int) -> tuple:
+        statement = select(
+            func.count(), func.max(User.id), func.max(User.updated_at)
+        ).where(User.org_id == org_id)
+        count, max_id, max_updated_at = session.execute(statement=statement).one()
+        return count, max_id or 0, max_updated_at
+
+    def _field_list(self, session: Session, org_id: int) -> List[str]:
+        statement = select(Organization.org_config).where(Organization.id == org_id)
+        return field_list_for(session.execute(statement=statement).scalar())
+
+    def _db_now(self, session: Session):
+        return session.execute(select(func.now())).scalar()
+
+    def _load(self, session: Session, org_id: int) -> OrgSnapshot:
+        snapshot = OrgSnapshot(org_id, self._field_list(session, org_id))
+        snapshot.synced_at = self._db_now(session)
+        statement = (
+            select(*User.__table__.columns)
+            .where(User.org_id == org_id)
+            .order_by(User.id)
+        )
+        snapshot.upsert(session.execute(statement=statement).mappings())
+        self.loads += 1
+        return snapshot
+
+    def _refresh(self, session: Session, snapshot: OrgSnapshot) -> OrgSnapshot:
+        # Every column is cached, so a new projection applies without reloading
+        field_list = self._field_list(session, snapshot.org_id)
+        if field_list != snapshot.field_list:
+            with snapshot.lock:
+                snapshot.field_list = field_list
+        synced_at = self._db_now(session)
+        count, max_id, max_updated_at = self._version(session, snapshot.org_id)
+        settled = (
+            snapshot.max_updated_at is None
+            or snapshot.synced_at - self.settle >= snapshot.max_updated_at
+        )
+        if settled and (count, max_id, max_updated_at) == (
+            snapshot.count,
+            snapshot.max_id,
+            snapshot.max_updated_at,
+        ):
+            return snapshot
+        changed = User.id > snapshot.max_id
+        if snapshot.max_updated_at is not None:
+            # Late commits carry an updated_at up to `settle` before the max
+            changed = or_(
+                changed, User.updated_at >= snapshot.max_updated_at - self.settle
+            )
+        statement = (
+            select(*User.__table__.columns)
+            .where(User.org_id == snapshot.org_id, changed)
+            .order_by(User.id)
+        )
+        snapshot.upsert(session.execute(statement=statement).mappings())
+        snapshot.synced_at = synced_at
+        if snapshot.count != count:
+            # Rows were deleted or moved to another organization
+            return self._load(session, snapshot.org_id)
+        return snapshot
+
+    def _fresh(self, org_id: int) -> Optional[OrgSnapshot]:
+        snapshot = self._snapshots.get(org_id)
+        if snapshot is not None and self._now() - snapshot.checked_at < self.interval:
+            self.hits += 1
+            self._snapshots.move_to_end(org_id)
+            return snapshot
+        return None
+
+    def get(self, org_id: int, engine: Engine) -> Optional[OrgSnapshot]:
+        with self._lock:
+            snapshot = self._fresh(org_id)
+            if snapshot is not None:
+                return snapshot
+            org_lock = self._org_locks.setdefault(org_id, threading.Lock())
+
+        with org_lock:
+            with self._lock:
+                # Another thread may have refreshed it while this one waited
+                snapshot = self._fresh(org_id)
+                if snapshot is not None:
+                    return snapshot
+                snapshot = self._snapshots.get(org_id)
+                generation = self._generation
+            now = self._now()
+            with Session(engine) as session:
+                if snapshot is None:
+                    snapshot = self._load(session, org_id)
+                else:
+                    snapshot = self._refresh(session, snapshot)
+            snapshot.checked_at = now
+
+        with self._lock:
+            if generation != self._generation:
+                # Invalidated during the load, it may predate the change
+                self._snapshots.pop(org_id, None)
+                return None
+            if snapshot.nbytes > self.budget:
+                # Too large to ever fit, let the caller query the database
+                self._snapshots.pop(org_id, None)
+                return None
+            self._snapshots[org_id] = snapshot
+            self._snapshots.move_to_end(org_id)
+            while self.nbytes > self.budget:
+                self._snapshots.popitem(last=False)
+                self.evictions += 1
+            return snapshot
+
+    def invalidate(self, org_id: Optional[int] = None) -> None:
+        with self._lock:
+            self._generation += 1
+            if org_id is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(org_id, None)
+
+    def metrics(self) -> dict:
+        return {
+            "organizations": list(self._snapshots.keys()),
+            "bytes": self.nbytes,
+            "budget_bytes": self.budget,
+            "hits": self.hits,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
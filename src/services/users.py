@@ -1,85 +1,315 @@
+import base64
 import math
-from functools import lru_cache
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
 
-from sqlalchemy import Column, Engine, and_, distinct, func, literal_column, select
+from sqlalchemy import (Column, Engine, and_, case, distinct, func,
+                        literal, literal_column, or_, select, tuple_)
 from sqlalchemy.orm import Session
 
+from config.settings import get_settings
 from models import Organization, User
-from schemas.users import FilterParam
+from schemas.users import ChangesParam, FilterParam
+
+from .coalescing import SingleFlight
+from .snapshot import SnapshotStore
+
+
+SEARCH_COLUMNS = (User.first_name, User.last_name, User.email)
 
 
 class UserService:
+    def __init__(
+        self,
+        snapshots: Optional[SnapshotStore] = None,
+        coalescer: Optional[SingleFlight] = None,
+        changes_settle_seconds: float = 60.0,
+        filter_cache_ttl: float = 60.0,
+    ):
+        # Optional in-memory snapshots answering single-organization listings
+        self.snapshots = snapshots
+        # Identical concurrent requests share one database execution
+        self.coalescer = coalescer or SingleFlight()
+        # Longest expected write transaction: the changes feed holds back newer rows
+        self.changes_settle_seconds = float(changes_settle_seconds)
+        # Filter values per engine as (loaded at, response). invalidate() only
+        # reaches this process, the TTL bounds staleness in other workers.
+        self.filter_cache_ttl = float(filter_cache_ttl)
+        self._filter_values: Dict[Engine, tuple] = {}
+        self._filter_generation = 0
+        self._filter_lock = threading.Lock()
+
     # Build columns to select (support Column objects or strings)
     def col_attr(self, c):
         if isinstance(c, Column):
             return getattr(User, c.name)
         return getattr(User, c)  # assume string name
 
+    def field_list_for(self, org: Organization | None) -> list:
+        # Columns enabled in the organization's org_config, or every column
+        if org and org.org_config:
+            return [key for key, value in org.org_config.items() if value is True]
+        return list(User.__table__.columns)
+
+    def apply_filters(self, statement, query_params: FilterParam):
+        # Shared by the page and count statements so both see the same rows
+        if query_params.location:
+            statement = statement.filter_by(location=query_params.location)
+
+        if query_params.department:
+            statement = statement.filter_by(department=query_params.department)
+
+        if query_params.position:
+            statement = statement.filter_by(position=query_params.position)
+
+        if query_params.status:
+            statement = statement.filter(User.status.in_(query_params.status))
+
+        if query_params.q:
+            pattern = f"%{self.escape_like(query_params.q)}%"
+            statement = statement.filter(
+                or_(*[col.ilike(pattern, escape="\\") for col in SEARCH_COLUMNS])
+            )
+
+        return statement
+
+    def escape_like(self, value: str) -> str:
+        return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+    def search_order(self, query_params: FilterParam, dialect: str) -> list:
+        """
+        Rank search hits: exact match, then prefix match, then any substring.
+        On Postgres ties are broken by pg_trgm similarity.
+        """
+        if not query_params.q:
+            return []
+        term = query_params.q.lower()
+        prefix = f"{self.escape_like(term)}%"
+        exact = or_(*[func.lower(col) == term for col in SEARCH_COLUMNS])
+        starts = or_(
+            *[func.lower(col).like(prefix, escape="\\") for col in SEARCH_COLUMNS]
+        )
+        tier = case((exact, 0), (starts, 1), else_=2)
+        order = [tier]
+        if dialect == "postgresql":
+            similarity = func.greatest(
+                *[func.similarity(col, query_params.q) for col in SEARCH_COLUMNS]
+            )
+            order.append(similarity.desc())
+        return [*order, User.id]
+
+    def paginate(self, count: int, query_params: FilterParam) -> dict:
+        total_page = math.ceil(count / query_params.limit)
+        page = (query_params.offset // query_params.limit) + 1
+        return {"total_page": total_page, "page": page, "count": count}
+
+    def request_key(self, query_params: FilterParam) -> tuple:
+        # Equivalent FilterParams (e.g. reordered status values) share a key
+        params = query_params.model_dump()
+        params["status"] = sorted(set(params["status"]))
+        return tuple(
+            (name, tuple(value) if isinstance(value, list) else value)
+            for name, value in sorted(params.items())
+        )
+
     def get_user_list(self, query_params: FilterParam, engine: Engine):
+        return self.coalescer.do(
+            ("users", self.request_key(query_params)),
+            lambda: self.load_user_list(query_params, engine),
+        )
+
+    def load_user_list(self, query_params: FilterParam, engine: Engine):
+        if len(query_params.org_id) > 1:
+            return self.get_user_list_by_orgs(query_params, engine)
+
+        org_id = query_params.org_id[0] if query_params.org_id else None
+        if self.snapshots and org_id and not query_params.q:
+            snapshot = self.snapshots.get(org_id, engine)
+            if snapshot is not None:
+                count, data = snapshot.query(query_params)
+                return {**self.paginate(count, query_params), "data": data}
+
         field_list = list(User.__table__.columns)
         with Session(engine) as session:
-            if query_params.org_id:
-                statement = select(Organization).filter_by(id=query_params.org_id)
+            if org_id:
+                statement = select(Organization).filter_by(id=org_id)
                 result = session.execute(statement=statement).scalar_one_or_none()
-                if result and result.org_config:
-                    field_list = [
-                        key for key, value in result.org_config.items() if value is True
-                    ]
+                field_list = self.field_list_for(result)
 
             count_statement = select(func.count()).select_from(User)
             cols = [self.col_attr(col) for col in field_list]
             statement = select(*cols).select_from(User)
 
-            if query_params.org_id:
-                count_statement = count_statement.filter_by(org_id=query_params.org_id)
-                statement = statement.filter_by(org_id=query_params.org_id)
+            if org_id:
+                count_statement = count_statement.filter_by(org_id=org_id)
+                statement = statement.filter_by(org_id=org_id)
 
-            if query_params.location:
-                count_statement = count_statement.filter_by(
-                    location=query_params.location
-                )
-                statement = statement.filter_by(location=query_params.location)
+            count_statement = self.apply_filters(count_statement, query_params)
+            statement = self.apply_filters(statement, query_params)
+            # Page in id order, like the snapshot and multi-organization paths
+            statement = statement.order_by(
+                *(self.search_order(query_params, engine.dialect.name) or [User.id])
+            )
+            statement = statement.limit(query_params.limit).offset(query_params.offset)
 
-            if query_params.department:
-                count_statement = count_statement.filter_by(
-                    department=query_params.department
-                )
-                statement = statement.filter_by(department=query_params.department)
+            data = session.execute(statement=statement).mappings().all()
+            count = session.execute(statement=count_statement).scalar()
+
+            return {**self.paginate(count, query_params), "data": data}
+
+    def get_user_list_by_orgs(self, query_params: FilterParam, engine: Engine):
+        """
+        Serve several organizations at once, each paginated independently.
+        Organizations sharing the same org_config projection are fetched with a
+        single windowed query, and every count comes from one grouped query.
+        """
+        org_ids = list(dict.fromkeys(query_params.org_id))
+        lower = query_params.offset
+        upper = query_params.offset + query_params.limit
 
-            if query_params.position:
-                count_statement = count_statement.filter_by(
-                    position=query_params.position
+        with Session(engine) as session:
+            statement = select(Organization).where(Organization.id.in_(org_ids))
+            orgs = {
+                org.id: org for org in session.execute(statement=statement).scalars()
+            }
+
+            # Group organizations by projection shape: one page query per shape
+            shapes: dict[tuple, list[int]] = {}
+            for org_id in org_ids:
+                cols = tuple(
+                    self.col_attr(col) for col in self.field_list_for(orgs.get(org_id))
                 )
-                statement = statement.filter_by(position=query_params.position)
+                shapes.setdefault(cols, []).append(org_id)
+
+            count_statement = select(User.org_id, func.count()).where(
+                User.org_id.in_(org_ids)
+            )
+            count_statement = self.apply_filters(count_statement, query_params)
+            count_statement = count_statement.group_by(User.org_id)
+            counts = dict(session.execute(statement=count_statement).all())
 
-            if query_params.status:
-                count_statement = count_statement.filter(
-                    User.status.in_(query_params.status)
+            pages: dict[int, list] = {org_id: [] for org_id in org_ids}
+            for cols, shape_org_ids in shapes.items():
+                row_number = (
+                    func.row_number()
+                    .over(
+                        partition_by=User.org_id,
+                        order_by=self.search_order(query_params, engine.dialect.name)
+                        or User.id,
+                    )
+                    .label("_row_number")
+                )
+                inner = select(*cols, User.org_id.label("_org_id"), row_number).where(
+                    User.org_id.in_(shape_org_ids)
                 )
-                statement = statement.filter(User.status.in_(query_params.status))
+                inner = self.apply_filters(inner, query_params).subquery()
+                statement = (
+                    select(*[inner.c[col.key] for col in cols], inner.c._org_id)
+                    .where(
+                        and_(inner.c._row_number > lower, inner.c._row_number <= upper)
+                    )
+                    .order_by(inner.c._org_id, inner.c._row_number)
+                )
+                for row in session.execute(statement=statement).mappings():
+                    record = dict(row)
+                    pages[record.pop("_org_id")].append(record)
 
-            statement = statement.limit(query_params.limit).offset(query_params.offset)
+        return {
+            "organizations": [
+                {
+                    "org_id": org_id,
+                    **self.paginate(counts.get(org_id, 0), query_params),
+                    "data": pages[org_id],
+                }
+                for org_id in org_ids
+            ]
+        }
 
-            data = session.execute(statement=statement).mappings().all()
-            count = session.execute(statement=count_statement).scalar()
-            total_page = (count / query_params.limit) + (
-                1 if (count % query_params.limit > 0) else 0
-            )
-            page = (
-                ((query_params.offset / query_params.limit) + 1)
-                if query_params.offset > 0
-                else 1
+    def encode_watermark(self, updated_at: datetime, user_id: int) -> str:
+        token = f"{updated_at.isoformat()}|{user_id}".encode()
+        return base64.urlsafe_b64encode(token).decode()
+
+    def decode_watermark(self, watermark: str) -> tuple:
+        try:
+            updated_at, user_id = base64.urlsafe_b64decode(watermark).decode().split("|")
+            return datetime.fromisoformat(updated_at), int(user_id)
+        except ValueError as exc:
+            raise ValueError(f"Invalid watermark {watermark!r}") from exc
+
+    def get_user_changes(self, query_params: ChangesParam, engine: Engine):
+        """
+        Users inserted or updated after `since`, in keyset order on
+        (updated_at, id). Pass the returned watermark as the next `since`
+        to resume; `has_more` tells whether another call is needed.
+
+        updated_at is the writing transaction's start time, so a long write can
+        commit rows older than a watermark already handed out. Only rows older
+        than `changes_settle_seconds` are returned, which keeps the watermark
+        behind every transaction that may still be in flight.
+        """
+        since = self.decode_watermark(query_params.since) if query_params.since else None
+        field_list = list(User.__table__.columns)
+        with Session(engine) as session:
+            if query_params.org_id:
+                org = session.get(Organization, query_params.org_id)
+                field_list = self.field_list_for(org)
+
+            cols = [self.col_attr(col) for col in field_list]
+            # The watermark is built from these, so they are always returned
+            for required in (User.id, User.updated_at):
+                if required.key not in {col.key for col in cols}:
+                    cols.append(required)
+
+            now = session.execute(select(func.now())).scalar()
+            cutoff = now - timedelta(seconds=self.changes_settle_seconds)
+            statement = (
+                select(*cols)
+                .where(User.updated_at <= literal(cutoff, User.updated_at.type))
+                .order_by(User.updated_at, User.id)
             )
+            if query_params.org_id:
+                statement = statement.filter_by(org_id=query_params.org_id)
+            if since:
+                updated_at, user_id = since
+                statement = statement.where(
+                    tuple_(User.updated_at, User.id)
+                    > tuple_(literal(updated_at, User.updated_at.type), user_id)
+                )
+            statement = statement.limit(query_params.limit + 1)
 
-            return {
-                "total_page": total_page,
-                "page": page,
-                "count": count,
-                "data": data,
-            }
+            data = session.execute(statement=statement).mappings().all()
+
+        has_more = len(data) > query_params.limit
+        data = data[: query_params.limit]
+        watermark = (
+            self.encode_watermark(data[-1]["updated_at"], data[-1]["id"])
+            if data
+            else query_params.since
+        )
+        return {"data": data, "watermark": watermark, "has_more": has_more}
+
+    def _now(self) -> float:
+        return time.monotonic()
+
+    def invalidate(self, org_ids: set) -> None:
+        # Drop cached data derived from users after a write
+        with self._filter_lock:
+            self._filter_generation += 1
+            self._filter_values.clear()
+        if self.snapshots:
+            for org_id in org_ids:
+                self.snapshots.invalidate(org_id)
 
-    @lru_cache
     def get_filter_values(self, engine: Engine):
+        cached = self._filter_values.get(engine)
+        if cached is not None and self._now() - cached[0] < self.filter_cache_ttl:
+            return cached[1]
+        return self.coalescer.do(("filters",), lambda: self.load_filter_values(engine))
+
+    def load_filter_values(self, engine: Engine):
+        generation, loaded_at = self._filter_generation, self._now()
         response = {}
         with Session(engine) as session:
             statement = select(distinct(User.location))
@@ -98,7 +328,26 @@ class UserService:
             results = session.execute(statement=statement).scalars().all()
             response["organizations"] = results
 
+        with self._filter_lock:
+            # An invalidate() that ran meanwhile may postdate what was read
+            if generation == self._filter_generation:
+                self._filter_values[engine] = (loaded_at, response)
         return response
 
 
-user_services = UserService()
+settings = get_settings()
+
+user_services = UserService(
+    coalescer=SingleFlight(timeout=settings.coalescing_timeout),
+    changes_settle_seconds=settings.changes_settle_seconds,
+    filter_cache_ttl=settings.filter_cache_ttl,
+    snapshots=(
+        SnapshotStore(
+            memory_budget_bytes=settings.snapshot_memory_budget_mb * 1024 * 1024,
+            refresh_interval=settings.snapshot_refresh_interval,
+            settle_seconds=settings.changes_settle_seconds,
+        )
+        if settings.snapshot_enabled
+        else None
+    )
+)
@@ -0,0 +1,60 @@
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import SRC_PATH
+from config.settings import get_settings
+from main import build_parser, migrate, seed, serve
+
+
+def test_importing_main_stays_lightweight():
+    # A fresh interpreter: the entry point must not pull in the app or Faker
+    code = (
+        "import sys, main; "
+        "print(','.join(m for m in ('fastapi', 'sqlalchemy', 'faker', 'uvicorn', 'config.app') "
+        "if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=SRC_PATH,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == ""
+
+
+@pytest.mark.parametrize(
+    "argv, handler",
+    [([], serve), (["serve"], serve), (["seed"], seed), (["migrate"], migrate)],
+)
+def test_subcommands_dispatch_to_handlers(argv, handler):
+    args = build_parser().parse_args(argv)
+    assert args.handler is handler
+
+
+def test_migrate_accepts_target_revision():
+    assert build_parser().parse_args(["migrate", "base"]).revision == "base"
+
+
+def test_serve_configures_workers_and_recycling(monkeypatch):
+    calls = []
+    monkeypatch.setitem(
+        sys.modules, "uvicorn", SimpleNamespace(run=lambda *a, **kw: calls.append((a, kw)))
+    )
+    settings = get_settings()
+    monkeypatch.setattr(settings, "debug", True)
+    monkeypatch.setattr(settings, "max_requests", 5000)
+
+    serve(build_parser().parse_args(["serve", "--workers", "4", "--port", "9000"]))
+
+    (target,), options = calls[0]
+    assert target == "config.app:app"
+    assert options["workers"] == 4
+    assert options["port"] == 9000
+    assert options["reload"] is False
+    assert options["limit_max_requests"] == 5000
+    assert options["limit_max_requests_jitter"] == 500
+    assert options["timeout_graceful_shutdown"] == settings.graceful_timeout
@@ -0,0 +1,89 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from schemas.users import FilterParam
+from services.coalescing import CoalescedCallTimeout, SingleFlight
+from services.users import UserService
+
+
+release = threading.Event()
+
+
+@pytest.fixture(autouse=True)
+def reset_release():
+    release.clear()
+
+
+def run_concurrently(flight, key, fn, callers=5):
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        futures = [pool.submit(flight.do, key, fn) for _ in range(callers)]
+        # Let every follower join the in-flight call before the leader finishes
+        while flight.coalesced < callers - 1:
+            threading.Event().wait(0.001)
+        release.set()
+        return [future.exception() or future.result() for future in futures]
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight(timeout=5)
+    calls = []
+
+    def query():
+        calls.append(1)
+        release.wait(5)
+        return {"count": 3}
+
+    results = run_concurrently(flight, "key", query)
+
+    assert len(calls) == 1
+    assert results == [{"count": 3}] * 5
+    assert flight.metrics() == {
+        "executions": 1,
+        "coalesced": 4,
+        "timeouts": 0,
+        "in_flight": 0,
+    }
+
+
+def test_errors_propagate_to_every_waiter():
+    flight = SingleFlight(timeout=5)
+
+    def query():
+        release.wait(5)
+        raise RuntimeError("database went away")
+
+    results = run_concurrently(flight, "key", query)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    # The failed call is not remembered
+    assert flight.do("key", lambda: "retried") == "retried"
+
+
+def test_waiters_time_out():
+    flight = SingleFlight(timeout=0.01)
+    leader_started = threading.Event()
+
+    def query():
+        leader_started.set()
+        release.wait(5)
+        return "late"
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        leader = pool.submit(flight.do, "key", query)
+        leader_started.wait(5)
+        with pytest.raises(CoalescedCallTimeout):
+            flight.do("key", query)
+        release.set()
+        assert leader.result() == "late"
+    assert flight.timeouts == 1
+
+
+def test_equivalent_filter_params_share_a_key():
+    service = UserService()
+    first = FilterParam(org_id=[1], status=["ACTIVE", "TERMINATED"])
+    second = FilterParam(org_id=[1], status=["TERMINATED", "ACTIVE", "ACTIVE"])
+
+    assert service.request_key(first) == service.request_key(second)
+    assert service.request_key(first) != service.request_key(FilterParam(org_id=[2]))
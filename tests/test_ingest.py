@@ -0,0 +1,207 @@
+import json
+
+import anyio
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from models import User
+from models.users import StatusEnum
+from services.ingest import IngestFormatError, UserIngestService
+from services.users import UserService
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+CSV_HEADER = "first_name,last_name,email,phone_number,position,department,location,status,org_id\n"
+
+
+def test_bulk_csv_upserts_on_email(client: TestClient, sample_data, test_engine):
+    org_a = sample_data["org_a"]
+    body = (
+        CSV_HEADER
+        + f"Alice,Smith,alice@example.com,,Lead,Engineering,Japan,ACTIVE,{org_a}\n"
+        + f"Erin,Fox,erin@example.com,555-555,Designer,Design,Japan,NOT_STARTED,{org_a}\n"
+        + f"Bad,Status,bad@example.com,,,,,RETIRED,{org_a}\n"
+        + "No,Org,noorg@example.com,,,,,ACTIVE,999\n"
+    )
+    response = client.post(
+        "/api/v1/users/bulk", content=body, headers={"Content-Type": "text/csv"}
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["received"], report["upserted"], report["failed"]) == (4, 2, 2)
+    assert {error["line"] for error in report["chunks"][0]["errors"]} == {4, 5}
+
+    with Session(test_engine) as session:
+        users = {
+            user.email: user
+            for user in session.execute(select(User).filter_by(org_id=org_a)).scalars()
+        }
+    assert len(users) == 3
+    assert users["alice@example.com"].position == "Lead"
+    assert users["alice@example.com"].location == "Japan"
+    assert users["erin@example.com"].status == StatusEnum.NOT_STARTED
+
+
+def test_bulk_ingest_invalidates_filter_values(client: TestClient, sample_data):
+    assert "Japan" not in client.get("/api/v1/users/filters").json()["locations"]
+
+    record = {
+        "first_name": "Gus",
+        "last_name": "Hale",
+        "email": "gus@example.com",
+        "location": "Japan",
+        "org_id": sample_data["org_b"],
+    }
+    response = client.post(
+        "/api/v1/users/bulk",
+        content=json.dumps(record) + "\n",
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.json()["upserted"] == 1
+
+    assert "Japan" in client.get("/api/v1/users/filters").json()["locations"]
+
+
+def add_user(engine, location, org_id):
+    with Session(engine) as session:
+        session.add(
+            User(
+                first_name="Ivy",
+                last_name="Jones",
+                email=f"ivy.{location.lower()}@example.com",
+                location=location,
+                org_id=org_id,
+            )
+        )
+        session.commit()
+
+
+def test_filter_values_expire_without_local_invalidation(test_engine, sample_data):
+    # Writes made through another worker never reach this process's invalidate()
+    service = UserService(filter_cache_ttl=60)
+    current_time = 1000.0
+    service._now = lambda: current_time
+
+    assert "Kenya" not in service.get_filter_values(test_engine)["locations"]
+    add_user(test_engine, "Kenya", sample_data["org_a"])
+    assert "Kenya" not in service.get_filter_values(test_engine)["locations"]
+
+    current_time += 60
+    assert "Kenya" in service.get_filter_values(test_engine)["locations"]
+
+
+def test_filter_values_read_before_invalidate_are_not_cached(test_engine, sample_data):
+    service = UserService()
+
+    def invalidate_midway(*args):
+        # An ingest commits while the coalesced leader is still reading
+        service.invalidate({sample_data["org_a"]})
+
+    event.listen(test_engine, "after_cursor_execute", invalidate_midway, once=True)
+    service.get_filter_values(test_engine)
+    assert test_engine not in service._filter_values
+
+    service.get_filter_values(test_engine)
+    assert test_engine in service._filter_values
+
+
+def test_bulk_ingest_rejects_unknown_content_type(client: TestClient):
+    response = client.post(
+        "/api/v1/users/bulk", content="{}", headers={"Content-Type": "text/plain"}
+    )
+    assert response.status_code == 415
+
+
+def test_ingest_reports_each_chunk(test_engine, sample_data):
+    changed = []
+    service = UserIngestService(chunk_size=2, on_change=changed.append)
+    lines = [
+        json.dumps(
+            {
+                "first_name": f"User{i}",
+                "last_name": "Bulk",
+                "email": f"user{i}@example.com",
+                "org_id": sample_data["org_b"],
+            }
+        )
+        for i in range(3)
+    ] + ["{not json"]
+
+    report = service.ingest(lines, "ndjson", test_engine)
+
+    assert [chunk["upserted"] for chunk in report["chunks"]] == [2, 1]
+    assert report["chunks"][1]["errors"][0]["line"] == 4
+    assert changed == [{sample_data["org_b"]}]
+
+
+def test_ingest_reports_validation_errors_per_chunk(test_engine, sample_data):
+    service = UserIngestService(chunk_size=1)
+    validate = service.validate
+    calls = []
+
+    def flaky_validate(chunk, engine):
+        calls.append(chunk)
+        if len(calls) == 1:
+            raise OperationalError("SELECT organizations.id", {}, Exception("gone"))
+        return validate(chunk, engine)
+
+    service.validate = flaky_validate
+    lines = [
+        json.dumps(
+            {
+                "first_name": "Retry",
+                "last_name": "Me",
+                "email": f"retry{i}@example.com",
+                "org_id": sample_data["org_b"],
+            }
+        )
+        for i in range(2)
+    ]
+
+    report = service.ingest(lines, "ndjson", test_engine)
+
+    assert [chunk["upserted"] for chunk in report["chunks"]] == [0, 1]
+    assert report["chunks"][0]["errors"][0]["error"] == "Chunk failed: gone"
+
+
+@pytest.mark.anyio("asyncio")
+async def test_ingest_stream_stops_reading_when_worker_fails(test_engine):
+    service = UserIngestService(queue_size=1)
+    read = []
+
+    async def stream():
+        for i in range(1000):
+            read.append(i)
+            yield b"line\n"
+
+    with anyio.fail_after(5):
+        with pytest.raises(IngestFormatError):
+            await service.ingest_stream(stream(), "xml", test_engine)
+    assert len(read) < 1000
+
+
+@pytest.mark.anyio("asyncio")
+async def test_ingest_stream_splits_lines_across_body_chunks(test_engine, sample_data):
+    service = UserIngestService(chunk_size=10, queue_size=1)
+    body = (
+        CSV_HEADER
+        + f"Zoë,Quinn,zoe@example.com,,,,Norway,ACTIVE,{sample_data['org_b']}\n"
+    ).encode()
+
+    async def stream():
+        # Small pieces, splitting lines and the multi-byte "ë"
+        for start in range(0, len(body), 7):
+            yield body[start : start + 7]
+
+    report = await service.ingest_stream(stream(), "csv", test_engine)
+
+    assert report["upserted"] == 1
+    with Session(test_engine) as session:
+        user = session.execute(select(User).filter_by(email="zoe@example.com")).scalar_one()
+    assert user.first_name == "Zoë"
@@ -1,9 +1,10 @@
 import pytest
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.testclient import TestClient
 
 from middleware.rate_limiter import (SlidingWindowRateLimiter,
-                                     SlidingWindowRateLimitMiddleware)
+                                     SlidingWindowRateLimitMiddleware,
+                                     default_cost_func)
 
 
 @pytest.fixture
@@ -75,3 +76,44 @@ def test_rate_limit_middleware_returns_429_when_limit_exceeded():
     assert second.headers["Retry-After"] == "2"
     assert second.headers["X-RateLimit-Remaining"] == "0"
     assert second.json()["detail"] == "Too Many Requests"
+
+
+@pytest.mark.anyio("asyncio")
+async def test_rate_limiter_charges_request_cost():
+    limiter = SlidingWindowRateLimiter(limit=10, window_seconds=5)
+    current_time = 1000.0
+    limiter._now = lambda: current_time
+
+    assert await limiter.allow("key", cost=1) == (True, 9, 0.0)
+    current_time += 1
+    assert await limiter.allow("key", cost=8) == (True, 1, 0.0)
+
+    # Needs the 8-unit entry to expire, not just the oldest one
+    allowed, remaining, retry_after = await limiter.allow("key", cost=5)
+    assert allowed is False
+    assert remaining == 1
+    assert retry_after == pytest.approx(5.0)
+
+    # Costs above the limit are capped so they can still run on an idle window
+    current_time += 10
+    assert await limiter.allow("key", cost=50) == (True, 0, 0.0)
+
+
+@pytest.mark.parametrize(
+    "path, query, headers, cost",
+    [
+        ("/health", b"", [], 1),
+        ("/api/v1/users", b"limit=100", [], 1),
+        ("/api/v1/users", b"limit=100&offset=4900", [], 10),
+        ("/api/v1/users", b"org_id=1&org_id=2&limit=100&offset=400", [], 2),
+        ("/api/v1/users/changes", b"limit=10000", [], 20),
+        ("/api/v1/users/bulk", b"", [(b"content-length", b"3145728")], 3),
+        ("/api/v1/users/bulk", b"", [(b"transfer-encoding", b"chunked")], 10),
+        ("/api/v1/users", b"offset=abc", [], 1),
+    ],
+)
+def test_default_cost_func_weights_heavy_requests(path, query, headers, cost):
+    request = Request(
+        {"type": "http", "method": "GET", "path": path, "query_string": query, "headers": headers}
+    )
+    assert default_cost_func(request) == cost
@@ -0,0 +1,113 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from config.app import app
+from db.engine import get_engine
+from db.replicas import ReplicaRouter, get_replica_router
+from models import Base, Organization, User
+
+
+def build_database(path, location):
+    engine = create_engine(f"sqlite+pysqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        org = Organization(name="Org", org_config=None)
+        session.add(org)
+        session.flush()
+        session.add(
+            User(
+                first_name="Replica",
+                last_name="User",
+                email="replica@example.com",
+                location=location,
+                org_id=org.id,
+            )
+        )
+        session.commit()
+    return engine
+
+
+@pytest.fixture
+def replica_engines(tmp_path):
+    engines = [
+        build_database(tmp_path / "replica_1.db", "Replica 1"),
+        build_database(tmp_path / "replica_2.db", "Replica 2"),
+    ]
+    yield engines
+    for engine in engines:
+        engine.dispose()
+
+
+def test_round_robin_alternates_between_replicas(replica_engines, test_engine):
+    router = ReplicaRouter(replica_engines)
+
+    picks = [router.get_engine(primary=test_engine) for _ in range(4)]
+    assert picks == [replica_engines[0], replica_engines[1]] * 2
+
+
+def test_unhealthy_and_lagging_replicas_fall_back_to_primary(
+    replica_engines, test_engine
+):
+    broken = create_engine("sqlite+pysqlite:////nonexistent/dir/replica.db")
+    router = ReplicaRouter([broken, replica_engines[0]], max_lag_seconds=1.0)
+    router.check_health()
+
+    assert router.get_engine(primary=test_engine) is replica_engines[0]
+    assert router.metrics()["replicas"][0]["healthy"] is False
+
+    router._measure_lag = lambda engine: 30.0
+    router.check_health()
+    assert router.get_engine(primary=test_engine) is test_engine
+    assert router.metrics()["primary_fallbacks"] == 1
+
+
+def test_health_probes_run_off_the_request_path(replica_engines, test_engine):
+    router = ReplicaRouter(replica_engines[:1], health_check_interval=0.01)
+    probing, release = threading.Event(), threading.Event()
+
+    def hanging_probe(engine):
+        probing.set()
+        release.wait(5)
+        raise OSError("connection timed out")
+
+    router.start()
+    router._measure_lag = hanging_probe
+    try:
+        assert probing.wait(5)
+        # The last known state is served while the probe hangs
+        assert router.get_engine(primary=test_engine) is replica_engines[0]
+    finally:
+        release.set()
+        router.stop()
+    assert router.get_engine(primary=test_engine) is test_engine
+    assert router.metrics()["replicas"][0]["last_error"] == "connection timed out"
+
+
+def test_least_connections_prefers_idle_replica(replica_engines, test_engine):
+    router = ReplicaRouter(
+        [create_engine(engine.url) for engine in replica_engines],
+        strategy="least_connections",
+    )
+    busy, idle = router.replicas
+
+    with busy.engine.connect():
+        assert router.get_engine(primary=test_engine) is idle.engine
+
+
+def test_users_endpoint_reads_from_replica(replica_engines, test_engine):
+    app.dependency_overrides[get_engine] = lambda: test_engine
+    app.dependency_overrides[get_replica_router] = lambda: ReplicaRouter(
+        replica_engines[1:]
+    )
+    try:
+        with TestClient(app) as client:
+            response = client.get("/api/v1/users")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert [row["location"] for row in response.json()["data"]] == ["Replica 2"]
@@ -0,0 +1,209 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from models import Organization, User
+from models.users import StatusEnum
+from schemas.users import FilterParam
+from services.snapshot import OrgSnapshot, SnapshotStore
+from services.users import UserService
+
+
+@pytest.fixture
+def store():
+    return SnapshotStore(memory_budget_bytes=10 * 1024 * 1024, refresh_interval=0)
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {},
+        {"status": ["ACTIVE"]},
+        {"location": "USA", "status": ["ACTIVE", "TERMINATED"]},
+        {"department": "Operations"},
+        {"position": "Nobody"},
+        {"limit": 1, "offset": 1},
+    ],
+)
+def test_snapshot_matches_database(test_engine, sample_data, store, params):
+    query_params = FilterParam(org_id=[sample_data["org_a"]], **params)
+
+    from_db = UserService().get_user_list(query_params, test_engine)
+    from_memory = UserService(snapshots=store).get_user_list(query_params, test_engine)
+
+    assert store.loads == 1
+    assert from_memory["count"] == from_db["count"]
+    assert from_memory["total_page"] == from_db["total_page"]
+    assert [dict(row) for row in from_db["data"]] == from_memory["data"]
+
+
+def test_snapshot_refreshes_changed_rows_incrementally(test_engine, sample_data, store):
+    org_id = sample_data["org_b"]
+    with Session(test_engine) as session:
+        session.execute(update(User).values(updated_at=datetime(2020, 1, 1)))
+        session.commit()
+    snapshot = store.get(org_id, test_engine)
+    assert snapshot.count == 1
+
+    with Session(test_engine) as session:
+        session.add(
+            User(
+                first_name="Dana",
+                last_name="Evans",
+                email="dana@example.com",
+                location="Canada",
+                status=StatusEnum.NOT_STARTED,
+                org_id=org_id,
+                updated_at=datetime(2021, 1, 1),
+            )
+        )
+        session.commit()
+
+    refreshed = store.get(org_id, test_engine)
+    assert refreshed is snapshot
+    assert store.loads == 1
+    assert refreshed.count == 2
+    assert refreshed.filter(FilterParam(status=["NOT_STARTED"])).bit_count() == 1
+
+    with Session(test_engine) as session:
+        session.execute(
+            update(User).where(User.first_name == "Charlie").values(location="Peru")
+        )
+        session.commit()
+
+    assert store.get(org_id, test_engine) is snapshot
+    assert store.loads == 1
+    assert snapshot.filter(FilterParam(location="Canada")).bit_count() == 1
+    assert snapshot.filter(FilterParam(location="Peru")).bit_count() == 1
+
+
+def test_snapshot_applies_late_committed_updates(test_engine, sample_data):
+    store = SnapshotStore(
+        memory_budget_bytes=10 * 1024 * 1024, refresh_interval=0, settle_seconds=60
+    )
+    org_id = sample_data["org_a"]
+    now = datetime.utcnow().replace(microsecond=0)
+    with Session(test_engine) as session:
+        session.execute(
+            update(User)
+            .where(User.first_name == "Bob")
+            .values(updated_at=now - timedelta(seconds=10))
+        )
+        session.commit()
+    snapshot = store.get(org_id, test_engine)
+
+    # A transaction that started before Bob's update commits after the read:
+    # count, max id and max updated_at are all unchanged
+    with Session(test_engine) as session:
+        session.execute(
+            update(User)
+            .where(User.first_name == "Alice")
+            .values(location="Mexico", updated_at=now - timedelta(seconds=30))
+        )
+        session.commit()
+
+    assert store.get(org_id, test_engine) is snapshot
+    assert snapshot.filter(FilterParam(location="Mexico")).bit_count() == 1
+
+
+def test_snapshot_store_evicts_least_recently_used(test_engine, sample_data, store):
+    org_a, org_b = sample_data["org_a"], sample_data["org_b"]
+    sizes = {org_id: store.get(org_id, test_engine).nbytes for org_id in (org_a, org_b)}
+
+    bounded = SnapshotStore(memory_budget_bytes=sum(sizes.values()) - 1)
+    bounded.get(org_a, test_engine)
+    bounded.get(org_b, test_engine)
+    assert bounded.metrics()["organizations"] == [org_b]
+    assert bounded.evictions == 1
+
+    tiny = SnapshotStore(memory_budget_bytes=min(sizes.values()) - 1)
+    assert tiny.get(org_a, test_engine) is None
+    assert tiny.metrics()["organizations"] == []
+
+
+def test_snapshot_follows_org_config_changes(test_engine, sample_data, store):
+    org_id = sample_data["org_a"]
+    query_params = FilterParam(org_id=[org_id])
+    service = UserService(snapshots=store)
+    assert "email" in service.get_user_list(query_params, test_engine)["data"][0]
+
+    with Session(test_engine) as session:
+        org = session.get(Organization, org_id)
+        org.org_config = {**org.org_config, "email": False}
+        session.commit()
+
+    data = service.get_user_list(query_params, test_engine)["data"]
+    assert "email" not in data[0]
+    assert "first_name" in data[0]
+    assert store.loads == 1
+
+
+@pytest.mark.parametrize("offset", [0, 1, 63, 511, 512, 1500, 2999, 5000])
+def test_snapshot_page_skips_to_offset(offset):
+    snapshot = OrgSnapshot(1, ["id"])
+    statuses = list(StatusEnum)
+    snapshot.upsert(
+        {
+            "id": i,
+            "first_name": "First",
+            "last_name": "Last",
+            "email": f"user{i}@example.com",
+            "phone_number": None,
+            "position": None,
+            "department": None,
+            "location": None,
+            "status": statuses[i % 3 if i % 7 else 0],
+            "org_id": 1,
+            "updated_at": datetime(2020, 1, 1),
+        }
+        for i in range(1, 9001)
+    )
+    mask = snapshot.filter(FilterParam(status=["ACTIVE"]))
+    expected = [
+        i + 1 for i in range(snapshot.count) if mask >> i & 1
+    ][offset : offset + 100]
+
+    assert [row["id"] for row in snapshot.page(mask, offset, 100)] == expected
+
+
+def test_snapshot_store_loads_outside_store_lock(test_engine, sample_data):
+    store = SnapshotStore(memory_budget_bytes=10 * 1024 * 1024, refresh_interval=60)
+    org_a, org_b = sample_data["org_a"], sample_data["org_b"]
+    store.get(org_b, test_engine)
+
+    loading, release = threading.Event(), threading.Event()
+    load = store._load
+
+    def slow_load(session, org_id):
+        loading.set()
+        release.wait(5)
+        return load(session, org_id)
+
+    store._load = slow_load
+    cold = threading.Thread(target=store.get, args=(org_a, test_engine))
+    cold.start()
+    try:
+        assert loading.wait(5)
+        # A cold load of one organization does not block reads of another
+        assert store.get(org_b, test_engine).count == 1
+    finally:
+        release.set()
+        cold.join()
+    assert store.metrics()["organizations"] == [org_b, org_a]
+
+
+def test_snapshot_store_drops_load_invalidated_midway(test_engine, sample_data, store):
+    org_id = sample_data["org_a"]
+    load = store._load
+
+    def invalidated_load(session, org_id):
+        snapshot = load(session, org_id)
+        store.invalidate(org_id)
+        return snapshot
+
+    store._load = invalidated_load
+    assert store.get(org_id, test_engine) is None
+    assert store.metrics()["organizations"] == []
@@ -1,4 +1,13 @@
+from datetime import datetime, timedelta
+
 from fastapi.testclient import TestClient
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+
+from models import User
+from schemas.users import FilterParam
+from services import user_services
+from services.users import UserService
 
 
 def test_get_users_respects_org_config(client: TestClient, sample_data):
@@ -27,6 +36,22 @@ def test_get_users_respects_org_config(client: TestClient, sample_data):
     assert "department" not in record
 
 
+def test_single_org_pages_are_ordered_by_id(test_engine, sample_data):
+    statements = []
+    event.listen(
+        test_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    UserService().load_user_list(
+        FilterParam(org_id=[sample_data["org_a"]], limit=1, offset=1), test_engine
+    )
+
+    (page,) = [statement for statement in statements if "LIMIT" in statement]
+    assert "ORDER BY users.id" in page
+
+
 def test_get_users_filters_by_department(client: TestClient, sample_data):
     response = client.get(
         "/api/v1/users",
@@ -56,3 +81,128 @@ def test_get_filter_values_returns_distinct_sets(client: TestClient, sample_data
 
     org_names = {org["name"] for org in payload["organizations"]}
     assert org_names == {"Org A", "Org B"}
+
+
+def test_get_users_groups_multiple_orgs(client: TestClient, sample_data):
+    response = client.get(
+        "/api/v1/users",
+        params={
+            "org_id": [sample_data["org_a"], sample_data["org_b"]],
+            "limit": 1,
+        },
+    )
+    assert response.status_code == 200
+    groups = {group["org_id"]: group for group in response.json()["organizations"]}
+
+    org_a = groups[sample_data["org_a"]]
+    assert org_a["count"] == 2
+    assert org_a["total_page"] == 2
+    assert org_a["data"][0]["first_name"] == "Alice"
+    assert "email" in org_a["data"][0]
+
+    org_b = groups[sample_data["org_b"]]
+    assert org_b["count"] == 1
+    assert org_b["total_page"] == 1
+    assert set(org_b["data"][0].keys()) == {
+        "id",
+        "org_id",
+        "first_name",
+        "last_name",
+        "location",
+    }
+
+
+def test_get_users_search_ranks_matches(client: TestClient, sample_data):
+    response = client.get("/api/v1/users", params={"q": "C"})
+    assert response.status_code == 200
+    payload = response.json()
+
+    # "Charlie" starts with the term; the others only contain it ("alice", ".com")
+    assert payload["count"] == 3
+    assert [row["first_name"] for row in payload["data"]] == ["Charlie", "Alice", "Bob"]
+
+
+def test_get_users_search_respects_org_config(client: TestClient, sample_data):
+    response = client.get(
+        "/api/v1/users",
+        params={"org_id": sample_data["org_b"], "q": "davis"},
+    )
+    assert response.status_code == 200
+    payload = response.json()
+
+    assert payload["count"] == 1
+    assert "email" not in payload["data"][0]
+
+
+def test_get_user_changes_resumes_from_watermark(
+    client: TestClient, sample_data, test_engine, monkeypatch
+):
+    monkeypatch.setattr(user_services, "changes_settle_seconds", 0)
+    with Session(test_engine) as session:
+        session.execute(update(User).values(updated_at=datetime(2020, 1, 1)))
+        session.commit()
+
+    first = client.get("/api/v1/users/changes", params={"limit": 2}).json()
+    assert [row["first_name"] for row in first["data"]] == ["Alice", "Bob"]
+    assert first["has_more"] is True
+
+    second = client.get(
+        "/api/v1/users/changes", params={"since": first["watermark"]}
+    ).json()
+    assert [row["first_name"] for row in second["data"]] == ["Charlie"]
+    assert second["has_more"] is False
+
+    with Session(test_engine) as session:
+        session.execute(
+            update(User).where(User.first_name == "Alice").values(location="Mexico")
+        )
+        session.commit()
+
+    third = client.get(
+        "/api/v1/users/changes", params={"since": second["watermark"]}
+    ).json()
+    assert [row["location"] for row in third["data"]] == ["Mexico"]
+    assert third["data"][0]["updated_at"] > second["data"][0]["updated_at"]
+
+
+def test_get_user_changes_holds_back_unsettled_rows(
+    client: TestClient, sample_data, test_engine, monkeypatch
+):
+    now = datetime.utcnow().replace(microsecond=0)
+    with Session(test_engine) as session:
+        session.execute(update(User).values(updated_at=datetime(2020, 1, 1)))
+        session.execute(
+            update(User)
+            .where(User.first_name == "Charlie")
+            .values(updated_at=now - timedelta(seconds=10))
+        )
+        session.commit()
+
+    monkeypatch.setattr(user_services, "changes_settle_seconds", 60)
+    first = client.get("/api/v1/users/changes", params={"limit": 100}).json()
+    assert [row["first_name"] for row in first["data"]] == ["Alice", "Bob"]
+
+    # A long write that started before Charlie's update commits afterwards
+    with Session(test_engine) as session:
+        session.add(
+            User(
+                first_name="Dana",
+                last_name="Late",
+                email="dana@example.com",
+                org_id=sample_data["org_a"],
+                updated_at=now - timedelta(seconds=30),
+            )
+        )
+        session.commit()
+
+    # Once both have settled neither is skipped
+    monkeypatch.setattr(user_services, "changes_settle_seconds", 0)
+    second = client.get(
+        "/api/v1/users/changes", params={"since": first["watermark"], "limit": 100}
+    ).json()
+    assert [row["first_name"] for row in second["data"]] == ["Dana", "Charlie"]
+
+
+def test_get_user_changes_rejects_bad_watermark(client: TestClient, sample_data):
+    response = client.get("/api/v1/users/changes", params={"since": "not-a-watermark"})
+    assert response.status_code == 400